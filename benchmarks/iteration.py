@@ -0,0 +1,129 @@
+# -*- coding: utf-8  -*-
+"""Benchmark playing cups through step against the old play_match loop.
+
+Run from the repository root with
+"python benchmarks/iteration.py --path DIR", where DIR is a checkout of the
+tree before step was added (commit 99df446), for example made with
+"git worktree add DIR 99df446". Each cup is played to the end repeatedly,
+once in this tree by looping over step, and once in the old tree by calling
+play_match until CupFinished is raised, each time with a newly built cup.
+There play_match found the end of each round and of the cup through
+IndexError and raised CupFinished after the final.
+
+The old tree is timed in a separate process, since both trees provide the
+same modules.
+"""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import timeit
+
+import competitions
+from competitions.match.default.TestMatch import TestMatch
+
+CUPS = [
+    ('single elimination, 8 teams', 'PowerOfTwoSingleEliminationCup', {'rounds': 3}),
+    ('single elimination, 1024 teams', 'PowerOfTwoSingleEliminationCup', {'rounds': 10}),
+    ('stepladder, 8 teams', 'StepladderCup', {'team_count': 8}),
+    ('stepladder, 1024 teams', 'StepladderCup', {'team_count': 1024}),
+    ('double elimination, 8 teams', 'PowerOfTwoDoubleEliminationCup', {'rounds': 3}),
+    ('double elimination, 1024 teams', 'PowerOfTwoDoubleEliminationCup', {'rounds': 10}),
+]
+"""(name, cup class, constructor arguments) of each benchmarked cup."""
+
+
+def cup_factory(class_name, arguments):
+    """Return a function building a cup of a class from the default cups."""
+    # The cups are imported late, after the old tree may have been put first
+    from competitions.cup.default import poweroftwo_double, single_elimination, stepladder
+    for module in (poweroftwo_double, single_elimination, stepladder):
+        if hasattr(module, class_name):
+            cup_class = getattr(module, class_name)
+            return lambda: cup_class(match_class=TestMatch, **arguments)
+    raise ValueError('Unknown cup class {}'.format(class_name))
+
+
+def play_steps(cup):
+    """Play a cup by calling step until it returns None."""
+    step = cup.step
+    while step() is not None:
+        pass
+
+
+def play_matches(cup):
+    """Play a cup by calling play_match until it raises CupFinished."""
+    from competitions.cup import CupFinished
+    try:
+        while True:
+            cup.play_match()
+    except CupFinished:
+        pass
+
+
+def best_time(function, factory):
+    """Return the best time of building and playing a cup, in microseconds.
+
+    The building is timed too, since the old tree created every match when
+    the cup was built, while this one creates them as they are played.
+    """
+    times = timeit.repeat(lambda: function(factory()), number=20, repeat=5)
+    return min(times) / 20 * 1e6
+
+
+def time_cups(function):
+    """Time playing each cup with a function.
+
+    @return: The best time of building and playing each cup, in microseconds
+    @rtype: list
+    """
+    return [best_time(function, cup_factory(class_name, arguments))
+            for __, class_name, arguments in CUPS]
+
+
+def main(args=None):
+    """Run the benchmark and print a table of the results."""
+    parser = argparse.ArgumentParser(description='Benchmark step against the old play_match.')
+    parser.add_argument('--path', metavar='DIR', required=True,
+                        help='a checkout of the tree before step was added')
+    parser.add_argument('--old', action='store_true', help=argparse.SUPPRESS)
+    options = parser.parse_args(args)
+    if options.old:
+        # Time the old tree, with its package found first
+        competitions.__path__.insert(0, os.path.join(options.path, 'competitions'))
+        print(json.dumps(time_cups(play_matches)))
+        return 0
+    raised = json.loads(subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), '--path', options.path, '--old']).decode())
+    stepped = time_cups(play_steps)
+    print('{:<32} {:>10} {:>20} {:>8}'.format('cup', 'step (us)', 'old play_match (us)',
+                                              'ratio'))
+    for (name, class_name, arguments), step_time, raise_time in zip(CUPS, stepped, raised):
+        # The times are given per match played
+        matches = len(cup_factory(class_name, arguments)().schedule)
+        print('{:<32} {:>10.3f} {:>20.3f} {:>8.2f}'.format(
+            name, step_time / matches, raise_time / matches, raise_time / step_time))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# -*- coding: utf-8  -*-
+"""Benchmark simulating cups against building and playing them again.
+
+Run from the repository root with "python benchmarks/simulation.py". Each
+cup is simulated with simulate, which plays the same bracket repeatedly and
+rewinds it between runs, and then by building a new cup for each run,
+playing it and counting its results the same way.
+"""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division, print_function, unicode_literals
+
+import timeit
+
+from competitions.cup.default.poweroftwo_double import PowerOfTwoDoubleEliminationCup
+from competitions.cup.default.single_elimination import PowerOfTwoSingleEliminationCup
+from competitions.cup.default.stepladder import StepladderCup
+from competitions.cup.simulation import SimulationResults
+from competitions.match.default.TestMatch import TestMatch
+
+CUPS = [
+    ('single elimination, 8 teams',
+     lambda: PowerOfTwoSingleEliminationCup(match_class=TestMatch, rounds=3)),
+    ('single elimination, 1024 teams',
+     lambda: PowerOfTwoSingleEliminationCup(match_class=TestMatch, rounds=10)),
+    ('stepladder, 64 teams', lambda: StepladderCup(match_class=TestMatch, team_count=64)),
+    ('double elimination, 8 teams',
+     lambda: PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=3)),
+    ('double elimination, 64 teams',
+     lambda: PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=6)),
+]
+
+RUNS = 20
+"""The number of runs in each simulation."""
+
+
+def simulate(factory):
+    """Simulate a cup with simulate."""
+    factory().simulate(RUNS)
+
+
+def rebuild(factory):
+    """Simulate a cup by building and playing a new cup for each run."""
+    results = SimulationResults()
+    for __ in range(RUNS):
+        cup = factory()
+        results.add(cup.play_cup(), cup._round_teams())
+
+
+def best_time(function, factory):
+    """Return the best time per run of simulating the cup, in microseconds."""
+    times = timeit.repeat(lambda: function(factory), number=5, repeat=5)
+    return min(times) / 5 / RUNS * 1e6
+
+
+def main():
+    """Run the benchmark and print a table of the results."""
+    print('{:<32} {:>14} {:>14} {:>8}'.format('cup', 'simulate (us)', 'rebuild (us)',
+                                              'ratio'))
+    for name, factory in CUPS:
+        simulated = best_time(simulate, factory)
+        rebuilt = best_time(rebuild, factory)
+        print('{:<32} {:>14.1f} {:>14.1f} {:>8.2f}'.format(name, simulated, rebuilt,
+                                                           rebuilt / simulated))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+# -*- coding: utf-8  -*-
+"""Benchmark building, playing, updating and printing cups of many sizes.
+
+Run from the repository root with "python benchmarks/suite.py". Each cup
+type is built with 4 to 65536 teams, and the time of each operation is
+the best of several runs:
+
+- build: constructing the cup, with the template cache emptied first
+- build_and_play: constructing a cup and playing it with play_cup
+- play: playing a newly built cup with play_cup
+- update_teams: replacing the teams of an unplayed cup
+- print: printing a played cup with print_cup, with its layout dropped
+  first so that the whole printout is rendered
+
+Printing is only timed up to a size for each cup type, since the printout
+of a stepladder cup grows with the square of its team count.
+
+The results can be saved as a JSON baseline with --save and compared with
+a baseline with --compare, which exits with status 1 if an operation got
+slower than the threshold allows. The stored benchmarks/baseline.json was
+measured on one machine, so compare against a baseline saved on the same,
+otherwise idle machine before trusting small differences.
+
+With --path, the cups of another checkout are timed instead, like the
+tree before the optimizations. The stored baseline keeps the times of that
+tree (commit 99df446), measured in the same session, under "before", and
+--compare prints them next to the baseline.
+"""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import timeit
+
+import competitions
+from competitions.match.default.TestMatch import TestMatch
+
+SIZES = (4, 64, 1024, 65536)
+"""The team counts of the benchmarked cups."""
+
+QUICK_SIZES = (4, 64, 1024)
+"""The team counts benchmarked with --quick."""
+
+
+def cup_types():
+    """Import the cup classes and list the benchmarked cup types.
+
+    @return: (name, builder taking the list of teams, largest printed size)
+        of each cup type
+    @rtype: list
+    """
+    from competitions.cup.default.poweroftwo_double import PowerOfTwoDoubleEliminationCup
+    from competitions.cup.default.single_elimination import (
+        PowerOfTwoSingleEliminationCup, StandardSingleEliminationCup
+    )
+    from competitions.cup.default.stepladder import StepladderCup
+
+    def power_of_two_single(teams):
+        """Build a single-elimination cup for a power of two."""
+        return PowerOfTwoSingleEliminationCup(match_class=TestMatch,
+                                              rounds=len(teams).bit_length() - 1, teams=teams)
+
+    def standard_single(teams):
+        """Build a single-elimination cup with a walkover in every fourth first-round match."""
+        teams = [None if x % 8 == 7 else team for x, team in enumerate(teams)]
+        return StandardSingleEliminationCup(match_class=TestMatch,
+                                            rounds=len(teams).bit_length() - 1, teams=teams)
+
+    def stepladder(teams):
+        """Build a stepladder cup."""
+        return StepladderCup(match_class=TestMatch, teams=teams)
+
+    def power_of_two_double(teams):
+        """Build a double-elimination cup."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch,
+                                             rounds=len(teams).bit_length() - 1)
+        cup.update_teams(teams)
+        return cup
+
+    return [
+        ('single elimination', power_of_two_single, 65536),
+        ('standard single elimination', standard_single, 65536),
+        ('stepladder', stepladder, 256),
+        ('double elimination', power_of_two_double, 4096),
+    ]
+
+
+def measure(setup, run, min_time):
+    """Time a function, returning the best time of several runs.
+
+    The garbage collector is disabled during each run.
+
+    @param setup: Called before each run, without being timed
+    @type setup: callable
+    @param run: The timed function
+    @type run: callable
+    @param min_time: The least total time to spend in run, in seconds
+    @type min_time: float
+    @return: The best time, in seconds
+    @rtype: float
+    """
+    timer = timeit.default_timer
+    times = []
+    while len(times) < 3 or (sum(times) < min_time and len(times) < 1000):
+        setup()
+        # Like timeit, keep the garbage collector out of the timings
+        gc.disable()
+        try:
+            start = timer()
+            run()
+            times.append(timer() - start)
+        finally:
+            gc.enable()
+    return min(times)
+
+
+def benchmark_cup(build, size, print_limit, min_time):
+    """Benchmark the operations of one cup.
+
+    Only play_cup, update_teams and print_cup are used on the cups, so the
+    suite can also time trees from before the template and layout caches.
+
+    @return: The best time of each operation, by name
+    @rtype: dict
+    """
+    from competitions.cup import Bracket
+    teams = ['Team {}'.format(x + 1) for x in range(size)]
+    results = {}
+    templates = getattr(Bracket, '_templates', {})
+    results['build'] = measure(templates.clear, lambda: build(teams), min_time)
+    results['build_and_play'] = measure(lambda: None, lambda: build(teams).play_cup(),
+                                        min_time)
+    cup = build(teams)
+    team_lists = [[team and team.upper() for team in cup.teams], cup.teams]
+
+    def update_teams():
+        team_lists.reverse()
+        cup.update_teams(team_lists[0])
+
+    results['update_teams'] = measure(lambda: None, update_teams, min_time)
+    cups = []
+
+    def new_cup():
+        cups[:] = [build(teams)]
+
+    results['play'] = measure(new_cup, lambda: cups[0].play_cup(), min_time)
+    if size <= print_limit:
+        cup = build(teams)
+        cup.play_cup()
+
+        def drop_printout():
+            # Trees without a layout cache render the whole printout anyway
+            schedule = getattr(cup, 'schedule', None)
+            if schedule is not None:
+                for bracket in schedule.brackets:
+                    bracket._invalidate()
+
+        results['print'] = measure(drop_printout, lambda: cup.print_cup(display=False),
+                                   min_time)
+    return results
+
+
+def run_suite(sizes, min_time, only=None):
+    """Run the benchmarks.
+
+    @param sizes: The team counts
+    @type sizes: iterable
+    @param min_time: The least time to spend on each operation, in seconds
+    @type min_time: float
+    @param only: Only run the cup types whose names contain this
+    @type only: str
+    @return: The best time of each benchmark, by "cup/size/operation"
+    @rtype: dict
+    """
+    results = {}
+    for name, build, print_limit in cup_types():
+        if only and only not in name:
+            continue
+        for size in sizes:
+            for operation, seconds in sorted(
+                    benchmark_cup(build, size, print_limit, min_time).items()):
+                key = '{}/{}/{}'.format(name, size, operation)
+                results[key] = seconds
+                print('{:<48} {:>14.6f} ms'.format(key, seconds * 1e3))
+                sys.stdout.flush()
+    return results
+
+
+def compare(results, baseline, threshold, before=None):
+    """Print how the results compare with a baseline.
+
+    @param results: The new results
+    @type results: dict
+    @param baseline: The baseline results
+    @type baseline: dict
+    @param threshold: The fraction by which a benchmark may get slower
+    @type threshold: float
+    @param before: The results of the tree before the optimizations, which
+        are only printed
+    @type before: dict
+    @return: The benchmarks that got slower than the threshold allows
+    @rtype: list
+    """
+    before = before or {}
+    regressions = []
+    print('{:<48} {:>12} {:>12} {:>12} {:>8}'.format('benchmark', 'before ms', 'baseline ms',
+                                                     'new ms', 'ratio'))
+    for key in sorted(set(results) & set(baseline)):
+        ratio = results[key] / baseline[key]
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            flag = ' slower'
+        earlier = '{:.6f}'.format(before[key] * 1e3) if key in before else '-'
+        print('{:<48} {:>12} {:>12.6f} {:>12.6f} {:>8.2f}{}'.format(
+            key, earlier, baseline[key] * 1e3, results[key] * 1e3, ratio, flag))
+    return regressions
+
+
+def main(args=None):
+    """Run the benchmark suite from the command line."""
+    parser = argparse.ArgumentParser(description='Benchmark cup operations.')
+    parser.add_argument('--quick', action='store_true',
+                        help='skip the largest cups and time fewer runs')
+    parser.add_argument('--only', help='only run the cup types whose names contain this')
+    parser.add_argument('--path', metavar='DIR',
+                        help='time the cups of another checkout of the package, such as '
+                             'the tree before a change')
+    parser.add_argument('--save', metavar='FILE', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare the results with a baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='fraction by which a benchmark may get slower (default 0.25)')
+    options = parser.parse_args(args)
+    if options.path:
+        competitions.__path__.insert(0, os.path.join(options.path, 'competitions'))
+
+    if options.quick:
+        results = run_suite(QUICK_SIZES, 0.05, options.only)
+    else:
+        results = run_suite(SIZES, 0.2, options.only)
+    if options.save:
+        with open(options.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'results': results}, f,
+                      indent=2, sort_keys=True)
+            f.write('\n')
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare(results, baseline['results'], options.threshold,
+                              baseline.get('before', {}).get('results'))
+        if regressions:
+            print('{} benchmarks got slower.'.format(len(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
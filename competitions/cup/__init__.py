@@ -18,8 +18,34 @@
 
 from __future__ import unicode_literals
 
+from array import array
+from collections import OrderedDict
+from copy import copy
+from itertools import repeat
+
+try:
+    from time import perf_counter as _clock
+except ImportError:  # Python 2
+    from time import time as _clock
+
 from competitions.match import Match
 
+from competitions.cup.simulation import SimulationResults
+
+
+_BLANK_CELL = ' ' * 40
+"""A blank cell of a printed bracket."""
+
+_LAYOUT_SKELETON_CACHE_CELLS = 1 << 16
+"""The number of cells kept in the layout skeleton cache.
+
+The least recently used skeletons are dropped first, and larger skeletons
+are kept by their brackets instead.
+"""
+
+_TEMPLATE_CACHE_SIZE = 16
+"""The number of bracket templates kept before the cache is cleared."""
+
 
 def init_nested_list(count):
     """Initialize an empty nested list.
@@ -32,6 +58,738 @@ def init_nested_list(count):
     return [[] for __ in range(count)]
 
 
+def _play_until_decided(match):
+    """Play a match until it has a winner.
+
+    @param match: The match
+    @type match: Match
+    """
+    match.play()
+    while not match.winner:
+        match.play()
+
+
+class Placeholder(object):
+
+    """A reference to a team decided by an earlier match.
+
+    The reference only keeps the match number and is rendered as text when it
+    is printed, so building a bracket does not format a string for each slot.
+    Placeholders compare equal to their text.
+    """
+
+    __slots__ = ('match_num',)
+
+    template = '{}'
+    """The format of the text, filled in with the match number."""
+
+    def __init__(self, match_num):
+        """Constructor.
+
+        @param match_num: The number of the earlier match
+        @type match_num: int
+        """
+        self.match_num = match_num
+
+    def __unicode__(self):
+        """Return the text of the placeholder.
+
+        @rtype: unicode
+        """
+        return self.template.format(self.match_num)
+
+    def __str__(self):
+        """Return the text of the placeholder as a str.
+
+        @rtype: str
+        """
+        return str(self.__unicode__())
+
+    def __format__(self, format_spec):
+        """Format the text of the placeholder."""
+        return format(self.__unicode__(), format_spec)
+
+    def __repr__(self):
+        """Return a representation of the placeholder."""
+        return '{}({!r})'.format(type(self).__name__, self.match_num)
+
+    def __eq__(self, other):
+        """Compare with another placeholder or with text."""
+        if isinstance(other, Placeholder):
+            return self.__unicode__() == other.__unicode__()
+        return self.__unicode__() == other
+
+    def __ne__(self, other):
+        """Compare with another placeholder or with text."""
+        return not self == other
+
+    def __hash__(self):
+        """Hash the placeholder like its text."""
+        return hash(self.__unicode__())
+
+
+class MatchWinner(Placeholder):
+
+    """The winner of an earlier match."""
+
+    __slots__ = ()
+
+    template = 'Match {} Winner'
+
+
+class MatchLoser(Placeholder):
+
+    """The loser of an earlier match."""
+
+    __slots__ = ()
+
+    template = 'Match {} Loser'
+
+
+class LosersMatchWinner(Placeholder):
+
+    """The winner of an earlier match in a losers bracket."""
+
+    __slots__ = ()
+
+    template = 'Match L{} Winner'
+
+
+_PLACEHOLDER_CLASSES = (None, MatchWinner, MatchLoser, LosersMatchWinner)
+"""The placeholder classes stored as slot codes, by the low two bits of the code."""
+
+_PLACEHOLDER_KINDS = dict((cls, kind) for kind, cls in enumerate(_PLACEHOLDER_CLASSES) if kind)
+"""The low two bits of the slot codes of each placeholder class."""
+
+
+class Layout(object):
+
+    """A sparse layout of a printed bracket.
+
+    Only the occupied cells are stored, so the size of a layout grows with
+    the number of matches rather than with the area of the printout.
+    """
+
+    def __init__(self, row_count, column_count, rows=None, columns=None):
+        """Constructor.
+
+        @param row_count: The number of rows
+        @type row_count: int
+        @param column_count: The number of columns
+        @type column_count: int
+        @param rows: The (first, stop) rows of the region laid out, or None
+            for every row
+        @type rows: tuple
+        @param columns: The (first, stop) columns of the region laid out, or
+            None for every column
+        @type columns: tuple
+        """
+        self.row_count = row_count
+        """The number of rows."""
+        self.column_count = column_count
+        """The number of columns."""
+        self.row_range = self._clamp(rows, row_count)
+        """The (first, stop) rows of the region laid out."""
+        self.column_range = self._clamp(columns, column_count)
+        """The (first, stop) columns of the region laid out."""
+        self.rows = {}
+        """The (column, match, team number) cells of each occupied row."""
+
+    @staticmethod
+    def _clamp(region, count):
+        """Limit a (first, stop) range to the size of the layout."""
+        if region is None:
+            return (0, count)
+        first, stop = region
+        first = min(max(first, 0), count)
+        return (first, min(max(stop, first), count))
+
+    def add(self, row, column, match, team_num):
+        """Place a team of a match in a cell.
+
+        @param row: The row of the cell
+        @type row: int
+        @param column: The column of the cell
+        @type column: int
+        @param match: The match
+        @type match: Match
+        @param team_num: Which team of the match to show (1 or 2)
+        @type team_num: int
+        """
+        cells = self.rows.get(row)
+        if cells is None:
+            self.rows[row] = [(column, match, team_num)]
+        else:
+            cells.append((column, match, team_num))
+
+    def cells(self, row):
+        """Return the occupied cells of a row.
+
+        @param row: The row
+        @type row: int
+        @return: The (column, match, team number) cells
+        @rtype: list
+        """
+        return self.rows.get(row, ())
+
+
+def _encode_slots(teams):
+    """Store the teams of one side of a round as slot codes.
+
+    @param teams: The team of each match, which may be a placeholder
+    @type teams: list
+    @return: (array of slot codes, list of teams or None if no slot holds a
+        team)
+    @rtype: tuple
+    """
+    codes = array(str('i'), [0]) * len(teams)
+    kinds = _PLACEHOLDER_KINDS
+    has_teams = has_placeholders = False
+    for index, team in enumerate(teams):
+        kind = kinds.get(type(team))
+        if kind is not None:
+            codes[index] = team.match_num << 2 | kind
+            has_placeholders = True
+        elif team is not None:
+            has_teams = True
+    if not has_teams:
+        return codes, None
+    if has_placeholders:
+        teams = [None if code else team for code, team in zip(codes, teams)]
+    return codes, teams
+
+
+def _decode_slot(codes, teams, index):
+    """Return the team in a slot, creating its placeholder if it has one.
+
+    @param codes: The slot codes of one side of a round
+    @type codes: array
+    @param teams: The teams of the same side, or None
+    @type teams: list
+    @param index: The index of the match
+    @type index: int
+    """
+    code = codes[index]
+    if code:
+        return _PLACEHOLDER_CLASSES[code & 3](code >> 2)
+    return None if teams is None else teams[index]
+
+
+def _copy_teams(teams):
+    """Copy the teams of one side of a round, which may be None."""
+    return None if teams is None else list(teams)
+
+
+def _set_slot(codes, teams, index, team):
+    """Put a team in a slot.
+
+    @param codes: The slot codes of one side of a round
+    @type codes: array
+    @param teams: The teams of the same side, or None
+    @type teams: list
+    @param index: The index of the match
+    @type index: int
+    @param team: The team, which may be a placeholder
+    @return: The teams of the side, created if needed
+    @rtype: list
+    """
+    kind = _PLACEHOLDER_KINDS.get(type(team))
+    if kind is not None:
+        codes[index] = team.match_num << 2 | kind
+        if teams is not None:
+            teams[index] = None
+        return teams
+    codes[index] = 0
+    if teams is None:
+        if team is None:
+            return None
+        teams = [None] * len(codes)
+    teams[index] = team
+    return teams
+
+
+class MatchRound(object):
+
+    """A round of matches stored as arrays of team slots.
+
+    A slot holds either a placeholder, stored as a code made of its match
+    number and its class and only created when it is read, or a team kept
+    in a list. The match objects are only created when they are accessed,
+    so the teams of matches that have not been reached yet take up a few
+    bytes each.
+    """
+
+    def __init__(self, match_class, first_teams, second_teams):
+        """Constructor.
+
+        @param match_class: The class of the match simulator
+        @type match_class: Any Match-like class
+        @param first_teams: The first team of each match
+        @type first_teams: list
+        @param second_teams: The second team of each match
+        @type second_teams: list
+        """
+        self.MatchClass = match_class
+        self._first_codes, self._first_teams = _encode_slots(first_teams)
+        self._second_codes, self._second_teams = _encode_slots(second_teams)
+        self._matches = None
+        self.match_count = len(first_teams)
+        """The number of matches in the round."""
+        self.changes = None
+        """The indexes of matches given new teams, while changes are tracked."""
+        self._shared = None
+        """The indexes of played matches shared with forks of the round, if any."""
+
+    def __len__(self):
+        """Return the number of matches in the round."""
+        return self.match_count
+
+    def __getitem__(self, index):
+        """Return a match, creating it if needed.
+
+        @param index: The index of the match
+        @type index: int
+        @rtype: Match
+        """
+        matches = self._matches
+        if matches is None:
+            matches = self._matches = [None] * self.match_count
+        match = matches[index]
+        if match is None:
+            # The slots are decoded here rather than by _slot_teams, since
+            # every played match is created on this path
+            code = self._first_codes[index]
+            if code:
+                team1 = _PLACEHOLDER_CLASSES[code & 3](code >> 2)
+            else:
+                team1 = None if self._first_teams is None else self._first_teams[index]
+            code = self._second_codes[index]
+            if code:
+                team2 = _PLACEHOLDER_CLASSES[code & 3](code >> 2)
+            else:
+                team2 = None if self._second_teams is None else self._second_teams[index]
+            match = matches[index] = self.MatchClass(team1, team2)
+        return match
+
+    def __iter__(self):
+        """Iterate over the matches, creating them if needed."""
+        for index in range(self.match_count):
+            yield self[index]
+
+    def _created_match(self, index):
+        """Return a match if it has been created, otherwise None.
+
+        @param index: The index of the match
+        @type index: int
+        """
+        return None if self._matches is None else self._matches[index]
+
+    def _slot_teams(self, index):
+        """Return the teams in the slots of a match.
+
+        @param index: The index of the match
+        @type index: int
+        @return: (team1, team2)
+        @rtype: tuple
+        """
+        return (_decode_slot(self._first_codes, self._first_teams, index),
+                _decode_slot(self._second_codes, self._second_teams, index))
+
+    def teams(self, index):
+        """Return the teams of a match without creating it.
+
+        @param index: The index of the match
+        @type index: int
+        @return: (team1, team2)
+        @rtype: tuple
+        """
+        match = self._created_match(index)
+        if match is None:
+            return self._slot_teams(index)
+        return (match.team1, match.team2)
+
+    def entrants(self):
+        """List the teams placed in the round, without creating its matches.
+
+        @return: The teams in the slots of the round, leaving out empty slots,
+            in no particular order
+        @rtype: list
+        """
+        matches = self._matches
+        if matches is not None and None not in matches:
+            # Every match of a played round has been created
+            entrants = ([match.team1 for match in matches] +
+                        [match.team2 for match in matches])
+            if None in entrants:
+                entrants = [team for team in entrants if team is not None]
+            return entrants
+        entrants = []
+        for index in range(self.match_count):
+            match = None if matches is None else matches[index]
+            if match is None:
+                team1, team2 = self._slot_teams(index)
+            else:
+                team1, team2 = match.team1, match.team2
+            if team1 is not None:
+                entrants.append(team1)
+            if team2 is not None:
+                entrants.append(team2)
+        return entrants
+
+    def set_team1(self, index, team):
+        """Set the first team of a match without creating it.
+
+        @param index: The index of the match
+        @type index: int
+        @param team: The team
+        """
+        match = None if self._matches is None else self._matches[index]
+        if match is None:
+            if team is not None and type(team) not in _PLACEHOLDER_KINDS:
+                # The winner of a played match is the usual team set here
+                teams = self._first_teams
+                if teams is None:
+                    teams = self._first_teams = [None] * self.match_count
+                self._first_codes[index] = 0
+                teams[index] = team
+            else:
+                self._first_teams = _set_slot(self._first_codes, self._first_teams, index, team)
+        else:
+            if self._shared and index in self._shared:
+                match = self._unshare(index)
+            match.team1 = team
+        if self.changes is not None:
+            self.changes.append(index)
+
+    def set_team2(self, index, team):
+        """Set the second team of a match without creating it.
+
+        @param index: The index of the match
+        @type index: int
+        @param team: The team
+        """
+        match = None if self._matches is None else self._matches[index]
+        if match is None:
+            if team is not None and type(team) not in _PLACEHOLDER_KINDS:
+                # The winner of a played match is the usual team set here
+                teams = self._second_teams
+                if teams is None:
+                    teams = self._second_teams = [None] * self.match_count
+                self._second_codes[index] = 0
+                teams[index] = team
+            else:
+                self._second_teams = _set_slot(self._second_codes, self._second_teams, index, team)
+        else:
+            if self._shared and index in self._shared:
+                match = self._unshare(index)
+            match.team2 = team
+        if self.changes is not None:
+            self.changes.append(index)
+
+    def set_teams(self, first_teams, second_teams):
+        """Set the teams of every match in the round.
+
+        @param first_teams: The first team of each match
+        @type first_teams: list
+        @param second_teams: The second team of each match
+        @type second_teams: list
+        """
+        self._first_codes, self._first_teams = _encode_slots(first_teams)
+        self._second_codes, self._second_teams = _encode_slots(second_teams)
+        self._update_matches()
+
+    def reset(self, shape):
+        """Give every match the teams of a shape of the round again.
+
+        The created matches are dropped, so they are created again by the
+        match class, without results, when they are next needed.
+
+        @param shape: A shape of the round returned by shape()
+        @type shape: MatchRound
+        """
+        self._first_codes = shape._first_codes[:]
+        self._second_codes = shape._second_codes[:]
+        self._first_teams = _copy_teams(shape._first_teams)
+        self._second_teams = _copy_teams(shape._second_teams)
+        self._matches = self._shared = None
+
+    def save(self, played):
+        """Save the teams of the matches not played yet.
+
+        @param played: The indexes of the played matches, or None
+        @type played: set
+        @return: The saved round, to be passed to restore, or None if every
+            match has been played
+        @rtype: tuple
+        """
+        if played and len(played) == self.match_count:
+            return None
+        first_codes, second_codes = self._first_codes[:], self._second_codes[:]
+        first_teams = _copy_teams(self._first_teams)
+        second_teams = _copy_teams(self._second_teams)
+        matches = None
+        if self._matches is not None:
+            for index, match in enumerate(self._matches):
+                if match is not None and not (played and index in played):
+                    first_teams = _set_slot(first_codes, first_teams, index, match.team1)
+                    second_teams = _set_slot(second_codes, second_teams, index, match.team2)
+            if played:
+                matches = [match if index in played else None
+                           for index, match in enumerate(self._matches)]
+        return (first_codes, first_teams, second_codes, second_teams, matches)
+
+    def restore(self, saved):
+        """Give the matches not played in a saved round their saved teams.
+
+        The slots are copied back as a whole, and the matches created since
+        the round was saved are dropped, so they are created again by the
+        match class when they are next needed.
+
+        @param saved: A round returned by save
+        @type saved: tuple
+        """
+        first_codes, first_teams, second_codes, second_teams, matches = saved
+        self._first_codes = first_codes[:]
+        self._second_codes = second_codes[:]
+        self._first_teams = _copy_teams(first_teams)
+        self._second_teams = _copy_teams(second_teams)
+        self._matches = None if matches is None else list(matches)
+        if self._shared:
+            self._shared = set(index for index in self._shared
+                               if self._matches is not None and
+                               self._matches[index] is not None)
+
+    def _update_matches(self):
+        """Give the created matches the teams in their slots."""
+        if self._matches is None:
+            return
+        for index, match in enumerate(self._matches):
+            if match is not None:
+                if self._shared and index in self._shared:
+                    match = self._unshare(index)
+                match.team1, match.team2 = self._slot_teams(index)
+
+    def _unshare(self, index):
+        """Replace a shared match with a copy owned by this round.
+
+        @param index: The index of the match
+        @type index: int
+        @return: The copy
+        @rtype: Match
+        """
+        match = self._matches[index] = copy(self._matches[index])
+        self._shared.discard(index)
+        return match
+
+    def copy(self, match_class=None):
+        """Return an unplayed copy of the round.
+
+        The copy has the current teams of each match and its own slots.
+
+        @param match_class: The class of the match simulator of the copy, or
+            None for the class of this round
+        @type match_class: Any Match-like class
+        @rtype: MatchRound
+        """
+        # The constructor is skipped, since the copy takes its slots from here
+        round = MatchRound.__new__(MatchRound)
+        round.MatchClass = match_class or self.MatchClass
+        round.match_count = self.match_count
+        round._matches = round.changes = round._shared = None
+        round._first_codes = self._first_codes[:]
+        round._second_codes = self._second_codes[:]
+        round._first_teams = _copy_teams(self._first_teams)
+        round._second_teams = _copy_teams(self._second_teams)
+        if self._matches is not None:
+            for index, match in enumerate(self._matches):
+                if match is not None:
+                    round.set_team1(index, match.team1)
+                    round.set_team2(index, match.team2)
+        return round
+
+    def shape(self):
+        """Return an unplayed copy of the round keeping only its placeholders.
+
+        Every other team is replaced with None, and the copy has no match
+        class, so it keeps no reference to the teams or to the matches.
+
+        @rtype: MatchRound
+        """
+        round = self.copy()
+        round.MatchClass = None
+        round._first_teams = round._second_teams = None
+        return round
+
+    def fork(self, played):
+        """Return a copy of the round sharing its played matches.
+
+        Either round copies a shared match before changing its teams, so
+        the played matches are never copied unless they are changed.
+
+        @param played: The indexes of the played matches
+        @type played: set
+        @rtype: MatchRound
+        """
+        round = self.copy()
+        if played:
+            matches = self._matches
+            round._matches = [None] * self.match_count
+            for index in played:
+                round._matches[index] = matches[index]
+            round._shared = set(played)
+            if self._shared is None:
+                self._shared = set(played)
+            else:
+                self._shared.update(played)
+        return round
+
+
+class Schedule(object):
+
+    """The matches of one or more brackets in play order.
+
+    Each entry is a (bracket, round number, match number) tuple. The entries
+    are kept in flat arrays, so a schedule takes a few bytes per match.
+    """
+
+    def __init__(self, brackets):
+        """Constructor.
+
+        @param brackets: The brackets whose matches are scheduled
+        @type brackets: tuple
+        """
+        self.brackets = brackets
+        """The brackets whose matches are scheduled."""
+        self.bracket_nums = array(str('B'))
+        """The index in brackets of the bracket of each entry."""
+        self.round_nums = array(str('i'))
+        """The round number of each entry."""
+        self.match_nums = array(str('i'))
+        """The match number of each entry."""
+
+    def __len__(self):
+        """Return the number of scheduled matches."""
+        return len(self.match_nums)
+
+    def __getitem__(self, index):
+        """Return an entry of the schedule.
+
+        @param index: The position of the entry
+        @type index: int
+        @return: (bracket, round number, match number)
+        @rtype: tuple
+        """
+        return (self.brackets[self.bracket_nums[index]], self.round_nums[index],
+                self.match_nums[index])
+
+    def __iter__(self):
+        """Iterate over the entries of the schedule."""
+        brackets = self.brackets
+        for bracket_num, round_num, match_num in zip(self.bracket_nums, self.round_nums,
+                                                     self.match_nums):
+            yield (brackets[bracket_num], round_num, match_num)
+
+    def add_round(self, bracket_num, round_num, match_nums):
+        """Schedule matches of a round.
+
+        @param bracket_num: The index in brackets of the bracket of the round
+        @type bracket_num: int
+        @param round_num: The round number
+        @type round_num: int
+        @param match_nums: The numbers of the matches, in play order
+        @type match_nums: iterable
+        """
+        count = len(self.match_nums)
+        self.match_nums.extend(match_nums)
+        count = len(self.match_nums) - count
+        self.round_nums.extend(repeat(round_num, count))
+        self.bracket_nums.extend(repeat(bracket_num, count))
+
+    def for_brackets(self, brackets):
+        """Return a schedule of the same matches for other brackets.
+
+        The entry arrays are shared with this schedule, so neither schedule
+        may have rounds added to it afterwards.
+
+        @param brackets: The brackets whose matches are scheduled
+        @type brackets: tuple
+        @rtype: Schedule
+        """
+        schedule = Schedule(brackets)
+        schedule.bracket_nums = self.bracket_nums
+        schedule.round_nums = self.round_nums
+        schedule.match_nums = self.match_nums
+        return schedule
+
+
+class BracketObserver(object):
+
+    """Base class for objects notified of the matches played in a bracket.
+
+    Every method does nothing, so subclasses only override the events they
+    follow. Matches played outside the bracket, like those handed out by a
+    Scheduler, are only reported through match_played.
+    """
+
+    def match_started(self, bracket, match):
+        """Called before the bracket plays a match.
+
+        @param bracket: The bracket
+        @type bracket: Bracket
+        @param match: The match
+        @type match: Match
+        """
+
+    def play_timed(self, bracket, match, seconds):
+        """Called after each call of the play method of a match.
+
+        @param bracket: The bracket
+        @type bracket: Bracket
+        @param match: The match
+        @type match: Match
+        @param seconds: The time spent in the play method
+        @type seconds: float
+        """
+
+    def match_replayed(self, bracket, match):
+        """Called when a match is played again because it had no winner.
+
+        @param bracket: The bracket
+        @type bracket: Bracket
+        @param match: The match
+        @type match: Match
+        """
+
+    def walkover_skipped(self, bracket, round_num, match_num):
+        """Called for each match left out of a round because of a walkover.
+
+        @param bracket: The bracket
+        @type bracket: Bracket
+        @param round_num: The round number of the match
+        @type round_num: int
+        @param match_num: The match number of the match in its round
+        @type match_num: int
+        """
+
+    def final_replayed(self, bracket, match):
+        """Called when a final has to be played a second time.
+
+        @param bracket: The cup
+        @type bracket: Cup
+        @param match: The final
+        @type match: Match
+        """
+
+    def match_played(self, bracket, match):
+        """Called after a match, once its winner has moved on.
+
+        @param bracket: The bracket
+        @type bracket: Bracket
+        @param match: The match
+        @type match: Match
+        """
+
+
 class Bracket(object):
 
     """Base class for tournament brackets."""
@@ -42,9 +800,99 @@ class Bracket(object):
         self.matches = []
         self.index = [0, -1]
         self.MatchClass = match_class
+        self.schedule = Schedule((self,))
+        """The matches of the bracket in play order."""
+        self._next_fixture = 0
+        self.version = 0
+        """A counter increased whenever the state of the bracket changes."""
+
+    _shape = ()
+    """The rounds of the unplayed bracket with only their placeholders, shared with its template."""
+
+    _templates = {}
+    """Templates of the structure of brackets, shared by brackets of the same shape."""
+
+    def _template_key(self):
+        """Return the key of the template of the bracket.
+
+        Brackets with the same key have the same structure apart from their
+        teams. Brackets without a key are not built from templates.
+
+        @rtype: tuple or None
+        """
+        return None
 
     def _build_bracket(self):
-        """Build the nested list representing the bracket."""
+        """Build the nested list representing the bracket.
+
+        The structure of the first bracket of each shape is cached at class
+        level as a template, and later brackets of that shape are copied from
+        it instead of being generated again.
+        """
+        key = self._template_key()
+        templates = Bracket._templates
+        template = None if key is None else templates.get(key)
+        if template is not None:
+            self._load_template(template)
+            return
+        self._build_structure()
+        if key is not None:
+            if len(templates) >= _TEMPLATE_CACHE_SIZE:
+                templates.clear()
+            templates[key] = self._make_template()
+
+    def _build_structure(self):
+        """Generate the rounds and the schedule of the bracket."""
+        Match = self.MatchClass
+        self.matches = [MatchRound(Match, first_teams, second_teams)
+                        for (first_teams, second_teams) in self._generate_pairings()]
+        self._shape = [round.shape() for round in self.matches]
+        self._build_schedule()
+
+    def _make_template(self):
+        """Save the structure of the newly built bracket.
+
+        The template only keeps the shape of the bracket, without its teams
+        or a reference to the bracket, since it outlives the bracket.
+
+        @return: The template, to be passed to _load_template
+        @rtype: dict
+        """
+        return {'rounds': self._shape, 'schedule': self.schedule.for_brackets(())}
+
+    def _load_template(self, template):
+        """Build the bracket as a copy of a template.
+
+        @param template: A template returned by _make_template
+        @type template: dict
+        """
+        Match = self.MatchClass
+        self._shape = template['rounds']
+        self.matches = [round.copy(Match) for round in self._shape]
+        self.schedule = template['schedule'].for_brackets((self,))
+
+    def _build_schedule(self):
+        """Build the play order of the bracket's matches."""
+        self.schedule = Schedule((self,))
+        for round_num in range(len(self.matches)):
+            self.schedule.add_round(0, round_num, self._scheduled_matches(round_num))
+
+    def _scheduled_matches(self, round_num):
+        """Determine which matches of a round are played.
+
+        @param round_num: The round number
+        @type round_num: int
+        @return: The numbers of the matches to play, in order
+        @rtype: iterable
+        """
+        return range(len(self.matches[round_num]))
+
+    def _generate_pairings(self):
+        """Generate the initial pairings of the bracket.
+
+        @return: Lists of the first and second teams of each round
+        @rtype: iterable
+        """
         raise NotImplementedError
 
     def _assign_winner(self, winner):
@@ -52,37 +900,319 @@ class Bracket(object):
         raise NotImplementedError
 
     def _set_current_match(self):
-        """Set the current match."""
-        self.index[1] += 1
-        round = self.matches[self.index[0]]
-        match = None
-        try:
-            match = round[self.index[1]]
-        except IndexError:
-            self.index[0] += 1
-            self.index[1] = 0
-            round = self.matches[self.index[0]]
-            match = round[0]
-        self.current_match = match
+        """Set the current match.
+
+        @return: Whether there was a match left to play
+        @rtype: bool
+        """
+        position = self._next_fixture
+        schedule = self.schedule
+        if position >= len(schedule.match_nums):
+            return False
+        self._next_fixture = position + 1
+        round_num = self.index[0] = schedule.round_nums[position]
+        match_num = self.index[1] = schedule.match_nums[position]
+        self.current_match = self.matches[round_num][match_num]
+        if self._observers:
+            # Rounds left out of the schedule, whose matches are all
+            # walkovers, are passed on the way to the new round
+            first = schedule.round_nums[position - 1] + 1 if position else 0
+            self._notify_walkovers(first, round_num + 1)
+        return True
+
+    def _notify_walkovers(self, first, last):
+        """Notify the observers of the walkovers in a range of rounds.
+
+        @param first: The first round number
+        @type first: int
+        @param last: The round number after the last round
+        @type last: int
+        """
+        for round_num in range(first, last):
+            for match_num in self._walkovers(round_num):
+                self._notify('walkover_skipped', round_num, match_num)
+
+    def step(self):
+        """Play the next match of the bracket.
+
+        @return: The played match, or None if the bracket is finished
+        @rtype: Match
+        """
+        return self._advance(False)
+
+    def _advance(self, played):
+        """Move on to the next match of the bracket and record its result.
+
+        @param played: Whether the match has already been played
+        @type played: bool
+        @return: The match, or None if the bracket is finished
+        @rtype: Match
+        """
+        if self._observers:
+            return self._advance_observed(played)
+        # The current match is set inline rather than by _set_current_match,
+        # since this runs for every match played without observers
+        position = self._next_fixture
+        schedule = self.schedule
+        if position >= len(schedule.match_nums):
+            return None
+        self._next_fixture = position + 1
+        round_num = self.index[0] = schedule.round_nums[position]
+        match_num = self.index[1] = schedule.match_nums[position]
+        match = self.current_match = self.matches[round_num][match_num]
+        if not played:
+            winner = None
+            while not winner:
+                match.play()
+                winner = match.winner
+        else:
+            winner = match.winner
+        self.version += 1
+        if round_num + 1 < len(self.matches):
+            self._assign_winner(winner)
+        else:
+            self.winner = winner
+        return match
+
+    def _advance_observed(self, played):
+        """Move on to the next match and record its result, notifying the observers.
+
+        @param played: Whether the match has already been played
+        @type played: bool
+        @return: The match, or None if the bracket is finished
+        @rtype: Match
+        """
+        if not self._set_current_match():
+            return None
+        match = self.current_match
+        if not played:
+            self._play_observed(match)
+        self.version += 1
+        if self.index[0] + 1 < len(self.matches):
+            self._assign_winner(match.winner)
+        else:
+            self.winner = match.winner
+        self._notify('match_played', match)
+        if self.finished:
+            self._notify_walkovers(self.index[0] + 1, len(self.matches))
+        return match
+
+    def _walkovers(self, round_num):
+        """List the matches of a round left out of the schedule as walkovers.
+
+        @param round_num: The round number
+        @type round_num: int
+        @rtype: list
+        """
+        return []
+
+    def _play_once(self, match):
+        """Play a match once, timing it for the observers if there are any."""
+        if not self._observers:
+            match.play()
+            return
+        start = _clock()
+        match.play()
+        self._notify('play_timed', match, _clock() - start)
+
+    def _play_observed(self, match):
+        """Play a match until it has a winner, notifying the observers."""
+        self._notify('match_started', match)
+        self._play_once(match)
+        while not match.winner:
+            self._notify('match_replayed', match)
+            self._play_once(match)
+
+    _observers = ()
+    """The objects notified of the matches played in the bracket."""
+
+    def add_observer(self, observer):
+        """Notify an object of every match played in the bracket.
+
+        The methods of the observer are called as matches are started,
+        timed, replayed and played. Without observers, the bracket plays
+        its matches without timing or notifying anything. Forks and clones
+        of the bracket do not keep its observers.
+
+        @param observer: The observer
+        @type observer: BracketObserver
+        """
+        self._observers = self._observers + (observer,)
+
+    def remove_observer(self, observer):
+        """Stop notifying an object of the matches played in the bracket.
+
+        @param observer: The observer
+        """
+        self._observers = tuple(other for other in self._observers if other is not observer)
+
+    def _notify(self, event, *args):
+        """Call the method of each observer for an event."""
+        for observer in self._observers:
+            getattr(observer, event)(self, *args)
+
+    def _round_fixtures(self):
+        """List the matches left in the current round of the schedule.
+
+        A round is a run of schedule entries for the same round of the same
+        bracket. Once the entries before it are played, the teams of all of
+        its matches are known and they can be played in any order.
+
+        @return: (bracket, match) for each match, in play order
+        @rtype: list
+        """
+        if self.finished:
+            return []
+        schedule = self.schedule
+        bracket_nums, round_nums = schedule.bracket_nums, schedule.round_nums
+        first = stop = self._next_fixture
+        while (stop < len(bracket_nums) and bracket_nums[stop] == bracket_nums[first] and
+               round_nums[stop] == round_nums[first]):
+            stop += 1
+        return [(bracket, bracket.matches[round_num][match_num])
+                for bracket, round_num, match_num in map(schedule.__getitem__,
+                                                         range(first, stop))]
+
+    def _match_position(self, match_num):
+        """Find a match from its number, counting from 1 through the rounds.
+
+        @param match_num: The number of the match
+        @type match_num: int
+        @return: (round number, match number in the round)
+        @rtype: tuple
+        """
+        index = match_num - 1
+        for round_num, round in enumerate(self.matches):
+            if index < round.match_count:
+                return (round_num, index)
+            index -= round.match_count
+        raise IndexError('No match {}'.format(match_num))
+
+    def _placeholder_bracket(self, bracket, placeholder):
+        """Return the bracket of the match a placeholder refers to.
+
+        @param bracket: The bracket of the placeholder
+        @type bracket: Bracket
+        @param placeholder: The placeholder
+        @type placeholder: Placeholder
+        @rtype: Bracket
+        """
+        return bracket
+
+    def _fixture_sources(self, bracket, round_num, match_num):
+        """Find the earlier matches deciding the teams of a scheduled match.
+
+        @param bracket: The bracket of the match
+        @type bracket: Bracket
+        @param round_num: The round number of the match
+        @type round_num: int
+        @param match_num: The match number of the match in its round
+        @type match_num: int
+        @return: (team number, (bracket, round number, match number) of the
+            earlier match, whether its loser moves on) for each undecided team
+        @rtype: list
+        """
+        sources = []
+        for team_num, team in enumerate(bracket.matches[round_num].teams(match_num), 1):
+            if isinstance(team, Placeholder):
+                source = self._placeholder_bracket(bracket, team)
+                sources.append((team_num, (source,) + source._match_position(team.match_num),
+                                isinstance(team, MatchLoser)))
+        return sources
+
+    def _plays_once(self, bracket):
+        """Whether the matches of a bracket are played once at a time.
+
+        Such matches may be drawn, and are only played again if
+        _replay_fixture asks for it.
+
+        @param bracket: The bracket of the matches
+        @type bracket: Bracket
+        @rtype: bool
+        """
+        return False
+
+    def _replay_fixture(self, bracket, match, leg):
+        """Record a played match that may have to be played again.
+
+        @param bracket: The bracket of the match
+        @type bracket: Bracket
+        @param match: The played match
+        @type match: Match
+        @param leg: The number of times the match was played before
+        @type leg: int
+        @return: Whether the match has to be played again
+        @rtype: bool
+        """
+        return False
+
+    def play_round_async(self):
+        """Play the matches left in the current round concurrently.
+
+        The play method of the match class may return an awaitable, which is
+        awaited. Once every match of the round has a winner, the winners move
+        on in schedule order, as if the matches had been played one at a time.
+        This requires Python 3.5 or later.
+
+        @return: A coroutine returning the played matches in play order
+        @rtype: coroutine
+        """
+        from competitions.cup.aio import play_round
+        return play_round(self)
+
+    def play_cup_async(self):
+        """Play the rest of the bracket, with the matches of each round played concurrently.
+
+        @return: A coroutine returning the winner
+        @rtype: coroutine
+        """
+        from competitions.cup.aio import play_cup
+        return play_cup(self)
+
+    def iter_matches(self):
+        """Play the remaining matches of the bracket one at a time.
+
+        @return: A generator of the played matches
+        @rtype: generator
+        """
+        match = self.step()
+        while match is not None:
+            yield match
+            match = self.step()
 
     def play_match(self):
         """Play a cup match.
 
+        This wraps step for code that expects the end of the cup to be
+        signalled by an exception.
+
         @return: The winner of the simulated match
-        @raise CupFinished: If the cup is finished
-        """
-        self._set_current_match()
-        winner = None
-        while not winner:
-            self.current_match.play()
-            winner = self.current_match.winner
-        try:
-            self._assign_winner(winner)
-        except IndexError:
-            self.winner = winner
-            raise CupFinished(winner)
+        @raise CupFinished: If the cup is finished, including by this match
+        """
+        match = self.step()
+        if match is None or self.finished:
+            raise CupFinished(self.winner)
+        return match.winner
 
-        return winner
+    @property
+    def finished(self):
+        """Whether every scheduled match has been played.
+
+        This is tracked apart from the winner, since a cup whose final can
+        be drawn may finish without one.
+        """
+        return self._next_fixture >= len(self.schedule)
+
+    def fixtures(self):
+        """List the scheduled matches without playing them.
+
+        @return: (bracket, round number, match number, team1, team2) for
+            each match, in play order
+        @rtype: generator
+        """
+        for bracket, round_num, match_num in self.schedule:
+            team1, team2 = bracket.matches[round_num].teams(match_num)
+            yield (bracket, round_num, match_num, team1, team2)
 
     @property
     def round_over(self):
@@ -91,68 +1221,413 @@ class Bracket(object):
         @return: Whether the current round is over
         @rtype: bool
         """
-        return (self.index[1] + 1) >= len(self.matches[self.index[0]])
+        position = self._next_fixture
+        schedule = self.schedule
+        return (position >= len(schedule.match_nums) or
+                schedule.round_nums[position] != self.index[0])
+
+    def reset(self):
+        """Reset the bracket to its unplayed state.
+
+        The rounds are given their initial pairings again, which are copied
+        from the shape of the bracket rather than generated again. Their
+        matches are dropped and created again by the match class when needed.
+        """
+        self.index = [0, -1]
+        self._next_fixture = 0
+        self.winner = None
+        self._invalidate()
+        for round, shape in zip(self.matches, self._shape):
+            round.reset(shape)
+
+    def fork(self):
+        """Create a copy of the bracket in its current state.
+
+        The fork is played separately from the bracket, for example to
+        simulate the rest of a cup many times. The matches played so far are
+        shared rather than copied, and the teams of a shared match are never
+        changed in place by either bracket.
+
+        @rtype: Bracket
+        """
+        fork = copy(self)
+        fork._fork_from(self)
+        return fork
+
+    def _fork_from(self, parent):
+        """Give a shallow copy of a bracket its own state.
+
+        @param parent: The bracket that was copied
+        @type parent: Bracket
+        """
+        played = parent._played_matches()
+        self.matches = [round.fork(played.get(round_num))
+                        for round_num, round in enumerate(parent.matches)]
+        self.schedule = parent.schedule.for_brackets((self,))
+        self.index = list(parent.index)
+        self._observers = ()
+
+    def _played_matches(self):
+        """Find the matches of the bracket played so far.
+
+        @return: The numbers of the played matches, by round number
+        @rtype: dict
+        """
+        schedule = self.schedule
+        bracket_num = schedule.brackets.index(self)
+        played = {}
+        for position in range(self._next_fixture):
+            if schedule.bracket_nums[position] == bracket_num:
+                played.setdefault(schedule.round_nums[position], set()).add(
+                    schedule.match_nums[position])
+        return played
+
+    def _invalidate(self):
+        """Note a change to the bracket other than playing a match."""
+        self.version += 1
+
+    def _save_state(self):
+        """Save the progress of the bracket.
+
+        @return: The saved state, to be passed to _restore_state
+        @rtype: tuple
+        """
+        played = self._played_matches()
+        rounds = [round.save(played.get(round_num))
+                  for round_num, round in enumerate(self.matches)]
+        return (list(self.index), self._next_fixture, self.winner, rounds)
+
+    def _restore_state(self, state):
+        """Rewind the bracket to a saved state.
+
+        Only the rounds with matches left to play in the saved state are
+        restored, each by copying back its saved slots, so rewinding costs
+        a few operations per round rather than per match.
+
+        @param state: A state returned by _save_state
+        @type state: tuple
+        """
+        index, self._next_fixture, winner, rounds = state
+        self.index = list(index)
+        self.winner = winner
+        self._invalidate()
+        for round, saved in zip(self.matches, rounds):
+            if saved is not None:
+                round.restore(saved)
+
+    def _round_teams(self):
+        """List the teams taking part in each round.
+
+        @return: A list of teams for each round
+        @rtype: list
+        """
+        return [round.entrants() for round in self.matches]
 
 
 class PrintableBracket(Bracket):
 
     """Mixin for a bracket printable to the console."""
 
-    def _generate_layout(self):
-        """Generate the bracket layout for display."""
+    def _layout_size(self):
+        """Return the size of the bracket layout.
+
+        @return: (number of rows, number of columns)
+        @rtype: tuple
+        """
         raise NotImplementedError
 
-    def _match_for_layout(self, test, round_num, match_num, first_team):
-        """Generate the layout entry for a match to place in a displayed bracket.
+    def _column_rows(self, column):
+        """Return where the team slots of a column are placed.
+
+        Column n shows round n of the bracket. Slot 2k of the round is the
+        first team of match k and slot 2k + 1 its second team.
+
+        @param column: The column
+        @type column: int
+        @return: (row of the first slot, number of rows between two slots)
+        @rtype: tuple
+        """
+        raise NotImplementedError
+
+    _layout_skeletons = OrderedDict()
+    """Layout skeletons shared by brackets of the same shape, with their
+    numbers of cells, from the least to the most recently used."""
+
+    _layout_skeleton_cells = 0
+    """The number of cells in the cached layout skeletons."""
+
+    _own_layout_skeleton = None
+    """The key and the layout skeleton of the bracket, if it is too large to
+    be shared."""
+
+    def _layout_key(self):
+        """Return the key of the layout skeleton of the bracket.
+
+        Brackets with the same key have the same layout geometry.
 
-        @param test: Whether to print a team or a blank space
-        @type test: bool
-        @param round_num: The round number in self.matches
-        @type round_num: int
-        @param match_num: The match number for the round in self.matches
-        @type match_num: int
-        @param first_team: Whether to return the string for the first team
-        @type first_team: bool
-        @return: ((match_num, new first_team), (match, old first_team))
         @rtype: tuple
         """
-        if test:
-            match = self.matches[round_num][match_num]
-            if match.is_walkover:
-                return (((match_num, False), (None, None)) if first_team
-                        else ((match_num + 1, True), (None, None)))
+        return (type(self),) + self._layout_size()
+
+    def _layout_skeleton(self):
+        """Return the geometry of the whole bracket layout.
+
+        The skeleton is computed once for each shape of bracket and cached at
+        class level. A skeleton with more cells than the whole cache may hold
+        is kept by the bracket instead, so it goes away with the bracket.
+
+        @return: The (column, match number, team number) cells of each
+            occupied row, where the column is also the round number
+        @rtype: dict
+        """
+        key = self._layout_key()
+        skeletons = PrintableBracket._layout_skeletons
+        entry = skeletons.pop(key, None)
+        if entry is None:
+            own = self._own_layout_skeleton
+            if own is not None and own[0] == key:
+                return own[1]
+            skeleton = self._build_layout_skeleton()
+            cells = sum(map(len, skeleton.values()))
+            if cells > _LAYOUT_SKELETON_CACHE_CELLS:
+                self._own_layout_skeleton = (key, skeleton)
+                return skeleton
+            entry = (skeleton, cells)
+            PrintableBracket._layout_skeleton_cells += cells
+            while PrintableBracket._layout_skeleton_cells > _LAYOUT_SKELETON_CACHE_CELLS:
+                PrintableBracket._layout_skeleton_cells -= skeletons.popitem(last=False)[1][1]
+        skeletons[key] = entry
+        return entry[0]
+
+    def _build_layout_skeleton(self):
+        """Compute the geometry of the whole bracket layout.
+
+        Walkovers are left out.
+
+        @rtype: dict
+        """
+        row_count, column_count = self._layout_size()
+        skeleton = {}
+        for column in range(column_count):
+            round = self.matches[column]
+            first_row, spacing = self._column_rows(column)
+            for slot in range(min(2 * len(round), -((first_row - row_count) // spacing))):
+                team1, team2 = round.teams(slot // 2)
+                if team1 is not None and team2 is not None:
+                    skeleton.setdefault(first_row + slot * spacing, []).append(
+                        (column, slot // 2, slot % 2 + 1))
+        return skeleton
+
+    def _generate_layout(self, rows=None, columns=None):
+        """Generate the bracket layout for display.
+
+        The layout of the whole bracket is filled in from the cached layout
+        skeleton. A region is laid out directly.
+
+        @param rows: The (first, stop) rows to lay out, or None for all
+        @type rows: tuple
+        @param columns: The (first, stop) columns to lay out, or None for all
+        @type columns: tuple
+        @rtype: Layout
+        """
+        layout = Layout(*self._layout_size(), rows=rows, columns=columns)
+        if rows is None and columns is None:
+            matches = self.matches
+            for row, cells in self._layout_skeleton().items():
+                layout.rows[row] = [(column, matches[column][match_num], team_num)
+                                    for column, match_num, team_num in cells]
+        else:
+            for column in range(*layout.column_range):
+                self._place_round(layout, column)
+        return layout
+
+    def _place_round(self, layout, column):
+        """Place the teams of a round in a column of a layout.
+
+        Only the slots in the rows of the layout region are visited.
+        Walkovers are left out.
+
+        @param layout: The layout
+        @type layout: Layout
+        @param column: The column, which is also the round number
+        @type column: int
+        """
+        round = self.matches[column]
+        first_row, spacing = self._column_rows(column)
+        row_first, row_stop = layout.row_range
+        slot = max(0, -((first_row - row_first) // spacing))
+        slot_stop = min(2 * len(round), -((first_row - row_stop) // spacing))
+        for slot in range(slot, slot_stop):
+            match = round[slot // 2]
+            if not match.is_walkover:
+                layout.add(first_row + slot * spacing, column, match, slot % 2 + 1)
+
+    def _view_region(self, rounds, matches):
+        """Find the layout region showing some rounds and matches.
+
+        @param rounds: The (first, stop) rounds to show, or None for all
+        @type rounds: tuple
+        @param matches: The (first, stop) matches of the first round shown
+            whose rows are shown, or None for all rows
+        @type matches: tuple
+        @return: The (first, stop) rows and columns of the region
+        @rtype: tuple
+        """
+        if matches is None:
+            return (None, rounds)
+        first_row, spacing = self._column_rows(rounds[0] if rounds else 0)
+        first, stop = matches
+        return ((first_row + 2 * first * spacing, first_row + (2 * stop - 1) * spacing + 1),
+                rounds)
+
+    def _render_row(self, layout, row):
+        """Render a row of the bracket layout.
+
+        @param layout: The layout
+        @type layout: Layout
+        @param row: The row number
+        @type row: int
+        @return: The line of the printout, ending with a newline
+        @rtype: str
+        """
+        first_column, stop_column = layout.column_range
+        line = [_BLANK_CELL] * (stop_column - first_column)
+        for column, match, team_num in layout.cells(row):
+            if team_num == 1:
+                team, score = match.team1, match.score1
             else:
-                return (((match_num, False), (match, 1)) if first_team
-                        else ((match_num + 1, True), (match, 2)))
+                team, score = match.team2, match.score2
+            line[column - first_column] = '{:<30} {:>4}     '.format(team, score)
+        line.append('\n')
+        return ''.join(line)
+
+    def _generate_rows(self, rounds=None, matches=None):
+        """Generate the console printout for the bracket, one line at a time.
+
+        @param rounds: The (first, stop) rounds to show, or None for all
+        @type rounds: tuple
+        @param matches: The (first, stop) matches of the first round shown
+            whose rows are shown, or None for all rows
+        @type matches: tuple
+        @return: The lines of the printout, each ending with a newline
+        @rtype: generator
+        """
+        layout = self._generate_layout(*self._view_region(rounds, matches))
+        yield '\n'
+        for row in range(*layout.row_range):
+            yield self._render_row(layout, row)
+
+    _layout = None
+    _printout = None
+    _printout_version = None
+
+    def _invalidate(self):
+        """Note a change to the bracket other than playing a match.
+
+        The cached layout is dropped and changes are no longer tracked.
+        """
+        super(PrintableBracket, self)._invalidate()
+        if self._layout is not None:
+            self._layout = None
+            for round in self.matches:
+                round.changes = None
+
+    def _fork_from(self, parent):
+        """Give a shallow copy of a bracket its own state, without a printout."""
+        super(PrintableBracket, self)._fork_from(parent)
+        self._layout = None
+        self._printout = self._printout_version = None
+
+    def _render(self):
+        """Render the whole bracket and cache the layout and the lines."""
+        layout = self._layout = self._generate_layout()
+        self._lines = ['\n']
+        self._match_rows = {}
+        for row in range(layout.row_count):
+            for __, match, __ in layout.cells(row):
+                self._match_rows.setdefault(id(match), []).append(row + 1)
+            self._lines.append(self._render_row(layout, row))
+        for round in self.matches:
+            round.changes = []
+        self._rendered_fixture = self._next_fixture
+
+    def _update_rendered(self):
+        """Render again the rows of the matches changed since the last render."""
+        schedule = self.schedule
+        changed = set(zip(schedule.round_nums[self._rendered_fixture:self._next_fixture],
+                          schedule.match_nums[self._rendered_fixture:self._next_fixture]))
+        for round_num, round in enumerate(self.matches):
+            if round.changes:
+                changed.update((round_num, match_num) for match_num in round.changes)
+                round.changes = []
+        line_nums = set()
+        for round_num, match_num in changed:
+            line_nums.update(self._match_rows.get(id(self.matches[round_num][match_num]), ()))
+        for line_num in line_nums:
+            self._lines[line_num] = self._render_row(self._layout, line_num - 1)
+        self._rendered_fixture = self._next_fixture
+
+    def _rendered_lines(self):
+        """Return the lines of the printout, rendering only what changed.
+
+        @return: The lines of the printout, each ending with a newline
+        @rtype: list
+        """
+        if self._layout is None:
+            self._render()
         else:
-            return ((match_num, first_team), (None, None))
-
-    def _generate_printout(self, layout):
-        """Generate the console printout for the bracket."""
-        printout = '\n'
-        for row in layout:
-            for cell in row:
-                match, team_num = cell
-                if not team_num:
-                    team, score = '', ''
-                elif team_num == 1:
-                    team, score = match.team1, match.score1
-                else:
-                    team, score = match.team2, match.score2
-                printout += '{:<30} {:>4}     '.format(team, score)
-            printout += '\n'
-        return printout
+            self._update_rendered()
+        return self._lines
 
-    def print_cup(self, display=True):
+    def write_cup(self, fp, rounds=None, matches=None):
+        """Write the printout of the cup to a text stream.
+
+        The printout is written one line at a time, so it is never held in
+        memory as a whole. A region of the cup can be written instead by
+        choosing rounds and matches; only that region is laid out.
+
+        @param fp: The stream to write to
+        @type fp: file-like object
+        @param rounds: The (first, stop) rounds to show, or None for all
+        @type rounds: tuple
+        @param matches: The (first, stop) matches of the first round shown
+            whose rows are shown, or None for all rows
+        @type matches: tuple
+        """
+        write = fp.write
+        for line in self._generate_rows(rounds, matches):
+            write(line)
+
+    def print_cup(self, display=True, rounds=None, matches=None):
         """Print the cup to a string and (optionally) the console.
 
+        The printout of the whole cup is cached for each version of the
+        bracket, and after a match is played only the rows showing changed
+        matches are rendered again. Changes made to the matches directly,
+        rather than through the bracket, are not noticed.
+
+        A region of the cup can be printed instead by choosing rounds and
+        matches, for example rounds=(2, 4) and matches=(0, 8) for the third
+        and fourth rounds next to the first eight third-round matches. The
+        time taken grows with the size of the region.
+
         @param display: Whether to print to the console.
         @type display: bool
+        @param rounds: The (first, stop) rounds to show, or None for all
+        @type rounds: tuple
+        @param matches: The (first, stop) matches of the first round shown
+            whose rows are shown, or None for all rows
+        @type matches: tuple
         @return: The displayed bracket
         @rtype: str
         """
-        layout = self._generate_layout()
-        printout = self._generate_printout(layout)
+        if rounds is not None or matches is not None:
+            printout = ''.join(self._generate_rows(rounds, matches))
+        elif self._printout_version != self.version:
+            printout = self._printout = ''.join(self._rendered_lines())
+            self._printout_version = self.version
+        else:
+            printout = self._printout
         if display:
             print(printout)
         return printout
@@ -198,16 +1673,61 @@ class Cup(Bracket):
         """The number of teams in this cup."""
         return len(self.teams)
 
-    def play_cup(self):
+    def play_cup(self, executor=None):
         """Play the whole cup.
 
+        With an executor, like a concurrent.futures.ThreadPoolExecutor, every
+        match is played in the executor as soon as its teams are decided, as
+        handed out by a Scheduler. The results are recorded in the calling
+        thread, and the cup moves on in schedule order as if the matches had
+        been played one at a time. This helps with match classes whose play
+        method blocks or releases the GIL.
+
+        @param executor: An optional executor to play the matches in
+        @type executor: concurrent.futures.Executor
         @return: The winner of the cup
         """
-        try:
-            while True:
-                self.play_match()
-        except CupFinished as e:
-            return e.winner
+        if executor is None:
+            advance = self._advance
+            while advance(False) is not None:
+                pass
+            return self.winner
+        from concurrent.futures import FIRST_COMPLETED, wait
+        from competitions.cup.scheduling import Scheduler
+        scheduler = Scheduler(self)
+        playing = {}
+        while True:
+            for match in scheduler.ready():
+                if scheduler.plays_once(match):
+                    future = executor.submit(match.play)
+                else:
+                    future = executor.submit(_play_until_decided, match)
+                playing[future] = match
+            if not playing:
+                return self.winner
+            done, __ = wait(playing, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+                scheduler.complete(playing.pop(future))
+
+    def simulate(self, runs):
+        """Play the cup repeatedly from its current state.
+
+        The same bracket is used for every run and is rewound to its current
+        state afterwards, so no matches are rebuilt between runs.
+
+        @param runs: The number of times to play the cup
+        @type runs: int
+        @return: The number of titles and rounds reached for each team
+        @rtype: SimulationResults
+        """
+        state = self._save_state()
+        results = SimulationResults()
+        for __ in range(runs):
+            winner = self.play_cup()
+            results.add(winner, self._round_teams())
+            self._restore_state(state)
+        return results
 
     def update_teams(self, teams):
         """Update the list of teams and the first-round matches.
@@ -217,6 +1737,33 @@ class Cup(Bracket):
         """
         raise NotImplementedError
 
+    def reset(self):
+        """Reset the cup to its unplayed state and place its teams again."""
+        super(Cup, self).reset()
+        self.update_teams(self.teams)
+
+    def _fork_from(self, parent):
+        """Give a shallow copy of a cup its own state."""
+        super(Cup, self)._fork_from(parent)
+        self.teams = list(parent.teams)
+
+    def _load_template(self, template):
+        """Build the cup as a copy of a template and place its own teams."""
+        super(Cup, self)._load_template(template)
+        self.update_teams(self.teams)
+
+    def clone(self, teams=None):
+        """Create a new, unplayed cup of the same shape.
+
+        The new cup is copied from the cached template of its shape, so
+        creating many cups of one shape does not generate the bracket again.
+
+        @param teams: The teams of the new cup, or None for the same teams
+        @type teams: list
+        @rtype: Cup
+        """
+        raise NotImplementedError
+
 
 class PrintableCup(Cup, PrintableBracket):
 
@@ -243,7 +1790,7 @@ class CupFinished(RuntimeError):
     def __init__(self, winner):
         """Constructor.
 
-        @param winner: The winner of the cup
+        @param winner: The winner of the cup, or None if its final was drawn
         @type winner: The type of teams in the cup
         """
         self.winner = winner
@@ -0,0 +1,94 @@
+# -*- coding: utf-8  -*-
+"""Playing cups with asyncio.
+
+The matches of a round of a cup are independent of each other, so their
+play methods can run concurrently when they wait on something else, like a
+remote scoring service. The play method of the match class may return an
+awaitable, which is awaited before the winner of the match is read.
+
+This module requires Python 3.5 or later.
+"""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import asyncio
+import inspect
+
+from competitions.cup.default.poweroftwo_double import PowerOfTwoDoubleEliminationCup
+
+
+async def play_once(match):
+    """Play a match once, awaiting the result of its play method if needed.
+
+    @param match: The match
+    @type match: Match
+    """
+    result = match.play()
+    if inspect.isawaitable(result):
+        await result
+
+
+async def play_match(match):
+    """Play a match until it has a winner.
+
+    @param match: The match
+    @type match: Match
+    """
+    await play_once(match)
+    while not match.winner:
+        await play_once(match)
+
+
+async def _play_final(cup):
+    """Play the final of a double-elimination cup, and replay it if needed."""
+    await play_once(cup.final)
+    if cup._record_final(0):
+        await play_once(cup.final)
+        cup._record_final(1)
+
+
+async def play_round(cup):
+    """Play the matches left in the current round of a cup concurrently.
+
+    Once every match of the round has a winner, the results are recorded in
+    schedule order, so the winners move on as if the matches had been played
+    one at a time.
+
+    @param cup: The cup
+    @type cup: Bracket
+    @return: The played matches, in play order
+    @rtype: list
+    """
+    fixtures = cup._round_fixtures()
+    if isinstance(cup, PowerOfTwoDoubleEliminationCup) and fixtures and fixtures[0][0] is cup:
+        await _play_final(cup)
+    else:
+        await asyncio.gather(*[play_match(match) for __, match in fixtures])
+    return [cup._advance(True) for __ in fixtures]
+
+
+async def play_cup(cup):
+    """Play the rest of a cup, with the matches of each round played concurrently.
+
+    @param cup: The cup
+    @type cup: Bracket
+    @return: The winner of the cup
+    """
+    while await play_round(cup):
+        pass
+    return cup.winner
@@ -18,10 +18,33 @@
 
 from __future__ import print_function, unicode_literals
 
-from competitions.cup import StandardCup, StandardBracket, CupFinished, init_nested_list
+from competitions.cup import (
+    LosersMatchWinner, MatchLoser, MatchRound, Schedule, StandardBracket, StandardCup
+)
 from competitions.cup.default.single_elimination import PowerOfTwoSingleEliminationCup
 
 
+def loser_placements(phases):
+    """Generate the losers bracket placements for winners bracket losers.
+
+    The placements cover the losers of every winners bracket round after the
+    first, in the order those losers are added to the losers bracket.
+
+    @param phases: The number of phases of the losers bracket
+    @type phases: int
+    @return: A list of (round, match) tuples
+    @rtype: list
+    """
+    placements = []
+    for phase in range(phases):
+        pairs = 2 ** max(phases - phase - 2, 0)
+        for pair in range(pairs):
+            placements.append(((phase * 2 + 1), (pair * 2 + 1)))
+            placements.append(((phase * 2 + 1), (pair * 2)))
+    del placements[-2]
+    return placements
+
+
 class PowerOfTwoDoubleEliminationCup(StandardCup):
 
     """Standard double-elimination cup for powers of two (4, 8, 16, etc.)."""
@@ -43,8 +66,32 @@ class PowerOfTwoDoubleEliminationCup(StandardCup):
         # Parameters
         self.require_double_win = require_double_win
 
-    def _build_bracket(self):
-        """Build the bracket."""
+    def _template_key(self):
+        """Return the key of the template of the cup."""
+        return (type(self), self.round_count)
+
+    def _build_structure(self):
+        """Build the brackets, the final and the schedule of the cup."""
+        self._build_brackets()
+        self._build_schedule()
+        self._reset_progress()
+
+    def _make_template(self):
+        """Save the schedule of the newly built cup.
+
+        The winners and losers brackets keep templates of their own.
+        """
+        return {'schedule': self.schedule.for_brackets(())}
+
+    def _load_template(self, template):
+        """Build the cup around the schedule of a template."""
+        self._build_brackets()
+        self.schedule = template['schedule'].for_brackets(
+            (self.winners_bracket, self.losers_bracket, self))
+        self._reset_progress()
+
+    def _build_brackets(self):
+        """Build the winners and losers brackets and the final."""
         Match = self.MatchClass
         rounds = self.round_count
         self.winners_bracket = PowerOfTwoSingleEliminationCup(match_class=Match,
@@ -53,58 +100,114 @@ class PowerOfTwoDoubleEliminationCup(StandardCup):
         self.losers_bracket = PowerOfTwoLosersBracket(match_class=Match, rounds=rounds)
         self.bracket_progression = [self.losers_bracket, self.winners_bracket,
                                     self.losers_bracket] * (rounds - 1)
+        self.matches = [self._final_round(Match)]
+
+    @staticmethod
+    def _final_round(match_class):
+        """Return a round holding the unplayed final.
+
+        @param match_class: The class of the match simulator, or None for a
+            shape of the round
+        @type match_class: Any Match-like class
+        @rtype: MatchRound
+        """
+        return MatchRound(match_class, ['Winners Bracket Winner'], ['Losers Bracket Winner'])
+
+    @property
+    def final(self):
+        """The final between the winners of the two brackets."""
+        return self.matches[0][0]
+
+    def _build_schedule(self):
+        """Build the play order of the cup's matches.
+
+        The first winners bracket round is followed by the rounds of the
+        brackets in bracket_progression and then by the final.
+        """
+        brackets = (self.winners_bracket, self.losers_bracket, self)
+        self.schedule = Schedule(brackets)
+        round_nums = [0, 0]
+        for bracket in [self.winners_bracket] + self.bracket_progression:
+            bracket_num = brackets.index(bracket)
+            round_num = round_nums[bracket_num]
+            self.schedule.add_round(bracket_num, round_num, bracket._scheduled_matches(round_num))
+            round_nums[bracket_num] += 1
+        self.schedule.add_round(2, 0, [0])
+
+    def _reset_progress(self):
+        """Reset the progress of the cup between its brackets."""
         self.current_bracket = self.winners_bracket
-        self.current_bracket_index = -1
-        self.final = Match('Winners Bracket Winner', 'Losers Bracket Winner')
+        self._next_fixture = 0
         self.final_scores = [('', ''), ('', '')]
         self.winners = {}
 
-    def _play_match(self):
-        """Play a match. Internal code."""
-        if self.current_bracket.round_over:
-            self.current_bracket_index += 1
-            self.current_bracket = self.bracket_progression[self.current_bracket_index]
-        winner = self.current_bracket.play_match()
-        if self.current_bracket == self.winners_bracket:
-            loser = self.current_bracket.current_match.loser
-            self.losers_bracket.add_team(loser)
-        return winner
-
-    def _bracket_finished(self, cf):
-        """Handle a finished sub-bracket."""
-        self.winners[self.current_bracket] = cf.winner
-        if self.current_bracket == self.winners_bracket:
-            self.final.team1 = cf.winner
-            loser = self.current_bracket.current_match.loser
-            self.losers_bracket.add_team(loser)
-        else:
-            self.final.team2 = cf.winner
-        return cf.winner
-
     def _play_final(self):
-        """Play the cup final."""
-        winner = self.final.play()
-        self.final_scores[0] = (self.final.score1, self.final.score2)
-        if not self.require_double_win or winner == self.winners[self.winners_bracket]:
-            self.winner = winner
-            raise CupFinished(winner)
-        else:
-            self.winner = self.final.play()
-            self.final_scores[1] = (self.final.score1, self.final.score2)
-            raise CupFinished(self.winner)
-
-    def play_match(self):
-        """Play a cup match.
-
-        @return: The winner of the simulated match
-        @raise CupFinished: If the cup is finished
+        """Play the cup final, and play it again if the cup requires it."""
+        final = self.final
+        if self._observers:
+            self._notify('match_started', final)
+        self._play_once(final)
+        if self._record_final(0):
+            self._play_once(final)
+            self._record_final(1)
+
+    def _record_final(self, leg):
+        """Record a result of the cup final.
+
+        @param leg: 0 for the first final, 1 for the replay
+        @type leg: int
+        @return: Whether the final has to be played again
+        @rtype: bool
         """
-        try:
-            return self._play_match()
-        except CupFinished as cf:
-            return self._bracket_finished(cf)
-        except IndexError:
-            self._play_final()
+        final = self.final
+        self.final_scores[leg] = (final.score1, final.score2)
+        if (leg == 0 and self.require_double_win and
+                final.winner != self.winners[self.winners_bracket]):
+            if self._observers:
+                self._notify('final_replayed', final)
+            return True
+        self.winner = final.winner
+        return False
+
+    def _advance(self, played):
+        """Move on to the next match of the cup and record its result.
+
+        @param played: Whether the match has already been played, with the
+            final recorded through _record_final
+        @type played: bool
+        @return: The match, or None if the cup is finished
+        @rtype: Match
+        """
+        position = self._next_fixture
+        schedule = self.schedule
+        if position >= len(schedule.match_nums):
+            return None
+        self._next_fixture = position + 1
+        bracket = schedule.brackets[schedule.bracket_nums[position]]
+        self.version += 1
+        if bracket is self:
+            if not played:
+                self._play_final()
+            if self._observers:
+                self._notify('match_played', self.final)
+            return self.final
+        self.current_bracket = bracket
+        if self._observers and not played:
+            self._play_observed(bracket.matches[schedule.round_nums[position]][
+                schedule.match_nums[position]])
+            played = True
+        match = bracket._advance(played)
+        if bracket is self.winners_bracket:
+            self.losers_bracket.add_team(match.loser)
+        if bracket.winner is not None:
+            self.winners[bracket] = bracket.winner
+            if bracket is self.winners_bracket:
+                self.final.team1 = bracket.winner
+            else:
+                self.final.team2 = bracket.winner
+        if self._observers:
+            self._notify('match_played', match)
+        return match
 
     def update_teams(self, teams):
         """Update the list of teams and the first-round matches.
@@ -114,34 +217,211 @@ class PowerOfTwoDoubleEliminationCup(StandardCup):
         """
         self.teams = teams
         self.winners_bracket.update_teams(teams)
+        self._invalidate()
+
+    def clone(self, teams=None):
+        """Create a new, unplayed cup of the same shape."""
+        return type(self)(match_class=self.MatchClass, rounds=self.round_count,
+                          teams=list(self.teams if teams is None else teams),
+                          require_double_win=self.require_double_win)
+
+    def reset(self):
+        """Reset the cup to its unplayed state.
+
+        The brackets and the final are given their initial pairings again, and
+        their matches are created again when needed.
+        """
+        self.winners_bracket.reset()
+        self.losers_bracket.reset()
+        self.matches[0].reset(self._final_round(None))
+        self._reset_progress()
+        self.winner = None
+        self._invalidate()
+
+    def _save_state(self):
+        """Save the progress of the cup.
+
+        @return: The saved state, to be passed to _restore_state
+        @rtype: tuple
+        """
+        return (self.winners_bracket._save_state(), self.losers_bracket._save_state(),
+                self.current_bracket, self._next_fixture,
+                self.matches[0].save(set([0]) if self.finished else None),
+                list(self.final_scores), dict(self.winners), self.winner)
+
+    def _restore_state(self, state):
+        """Rewind the cup to a saved state.
+
+        @param state: A state returned by _save_state
+        @type state: tuple
+        """
+        (winners_state, losers_state, self.current_bracket, self._next_fixture,
+         final_round, final_scores, winners, self.winner) = state
+        if final_round is not None:
+            self.matches[0].restore(final_round)
+        self.winners_bracket._restore_state(winners_state)
+        self.losers_bracket._restore_state(losers_state)
+        self.final_scores = list(final_scores)
+        self.winners = dict(winners)
+        self._invalidate()
+
+    def _placeholder_bracket(self, bracket, placeholder):
+        """Return the bracket of the match a placeholder refers to."""
+        if isinstance(placeholder, LosersMatchWinner):
+            return self.losers_bracket
+        return self.winners_bracket
+
+    def _fixture_sources(self, bracket, round_num, match_num):
+        """Find the earlier matches deciding the teams of a scheduled match.
+
+        The final waits for the last matches of the two brackets.
+        """
+        if bracket is not self:
+            return super(PowerOfTwoDoubleEliminationCup, self)._fixture_sources(
+                bracket, round_num, match_num)
+        return [(team_num, (source, len(source.matches) - 1, 0), False)
+                for team_num, source in ((1, self.winners_bracket), (2, self.losers_bracket))]
+
+    def _plays_once(self, bracket):
+        """Whether the matches of a bracket are played once, as the final is."""
+        return bracket is self
+
+    def _replay_fixture(self, bracket, match, leg):
+        """Record a played match, which has to be played again for a replayed final."""
+        return bracket is self and self._record_final(leg)
+
+    def _fork_from(self, parent):
+        """Give a shallow copy of a cup its own state and brackets."""
+        winners_bracket = self.winners_bracket = parent.winners_bracket.fork()
+        losers_bracket = self.losers_bracket = parent.losers_bracket.fork()
+        super(PowerOfTwoDoubleEliminationCup, self)._fork_from(parent)
+        brackets = (winners_bracket, losers_bracket, self)
+        self.schedule = parent.schedule.for_brackets(brackets)
+        forked = dict(zip(parent.schedule.brackets, brackets))
+        self.bracket_progression = [forked[bracket] for bracket in parent.bracket_progression]
+        self.current_bracket = forked[parent.current_bracket]
+        self.winners = dict((forked[bracket], winner)
+                            for bracket, winner in parent.winners.items())
+        self.final_scores = list(parent.final_scores)
+
+    def _round_teams(self):
+        """List the teams taking part in each round.
+
+        The winners bracket rounds come first, followed by the losers bracket
+        rounds and the final.
+
+        @return: A list of teams for each round
+        @rtype: list
+        """
+        final_teams = [team for team in (self.final.team1, self.final.team2)
+                       if team is not None]
+        return (self.winners_bracket._round_teams() + self.losers_bracket._round_teams() +
+                [final_teams])
 
-    def print_cup(self, display=True):
+    def _generate_final_rows(self):
+        """Generate the console printout for the final, one line at a time.
+
+        @return: The lines of the printout, each ending with a newline
+        @rtype: generator
+        """
+        yield '\n'
+        yield '\n'
+        yield '{:<30} {:>4} {:>4}     {:45}\n'.format(self.final.team1, self.final_scores[0][0],
+                                                      self.final_scores[1][0], '')
+        yield ' ' * 90 + '\n'
+        yield '{:<30} {:>4} {:>4}     {:45}\n'.format(self.final.team2, self.final_scores[0][1],
+                                                      self.final_scores[1][1], '')
+
+    def _generate_rows(self):
+        """Generate the console printout for the cup, one line at a time.
+
+        @return: The lines of the printout, each ending with a newline
+        @rtype: generator
+        """
+        for line in self.winners_bracket._generate_rows():
+            yield line
+        for line in self.losers_bracket._generate_rows():
+            yield line
+        for line in self._generate_final_rows():
+            yield line
+
+    def _view_bracket(self, bracket, rounds, matches):
+        """Find the bracket to show in a viewport.
+
+        @param bracket: 'winners', 'losers' or None for the whole cup
+        @type bracket: str
+        @return: The chosen bracket, or None for the whole cup
+        @rtype: Bracket
+        @raise ValueError: If the bracket is unknown, or if a region is
+            chosen without a bracket
+        """
+        if bracket == 'winners':
+            return self.winners_bracket
+        elif bracket == 'losers':
+            return self.losers_bracket
+        elif bracket is not None:
+            raise ValueError('Unknown bracket: {}'.format(bracket))
+        elif rounds is not None or matches is not None:
+            raise ValueError('A bracket must be chosen to show a region of the cup.')
+        return None
+
+    def write_cup(self, fp, rounds=None, matches=None, bracket=None):
+        """Write the printout of the cup to a text stream.
+
+        A region of the winners or losers bracket can be written instead by
+        choosing the bracket, rounds and matches.
+
+        @param fp: The stream to write to
+        @type fp: file-like object
+        @param rounds: The (first, stop) rounds to show, or None for all
+        @type rounds: tuple
+        @param matches: The (first, stop) matches of the first round shown
+            whose rows are shown, or None for all rows
+        @type matches: tuple
+        @param bracket: 'winners' or 'losers' to show only that bracket
+        @type bracket: str
+        @raise ValueError: If a region is chosen without a bracket
+        """
+        view = self._view_bracket(bracket, rounds, matches)
+        if view is None:
+            write = fp.write
+            for line in self._generate_rows():
+                write(line)
+        else:
+            view.write_cup(fp, rounds, matches)
+
+    def print_cup(self, display=True, rounds=None, matches=None, bracket=None):
         """Print the cup to a string and (optionally) the console.
 
+        A region of the winners or losers bracket can be printed instead by
+        choosing the bracket, rounds and matches.
+
         @param display: Whether to print to the console.
         @type display: bool
+        @param rounds: The (first, stop) rounds to show, or None for all
+        @type rounds: tuple
+        @param matches: The (first, stop) matches of the first round shown
+            whose rows are shown, or None for all rows
+        @type matches: tuple
+        @param bracket: 'winners' or 'losers' to show only that bracket
+        @type bracket: str
         @return: The displayed bracket
         @rtype: str
+        @raise ValueError: If a region is chosen without a bracket
         """
-        winners_printout = self.winners_bracket.print_cup(display=False)
-        losers_printout = self.losers_bracket.print_cup(display=False)
-        final_printout = (
-            '\n'
-            '{:<30} {:>4} {:>4}     '
-            '                                             '
-            '\n'
-            '                                             '
-            '                                             '
-            '\n'
-            '{:<30} {:>4} {:>4}     '
-            '                                             '
-            '\n'
-        ).format(self.final.team1, self.final_scores[0][0], self.final_scores[1][0],
-                 self.final.team2, self.final_scores[0][1], self.final_scores[1][1])
-        full_printout = winners_printout + losers_printout + '\n' + final_printout
-        if display:
-            print(full_printout)
-        return full_printout
+        view = self._view_bracket(bracket, rounds, matches)
+        if view is None:
+            return super(PowerOfTwoDoubleEliminationCup, self).print_cup(display)
+        return view.print_cup(display, rounds, matches)
+
+    def _rendered_lines(self):
+        """Return the lines of the printout, rendering only what changed.
+
+        @return: The lines of the printout, each ending with a newline
+        @rtype: list
+        """
+        return (self.winners_bracket._rendered_lines() + self.losers_bracket._rendered_lines() +
+                list(self._generate_final_rows()))
 
 
 class PowerOfTwoLosersBracket(StandardBracket):
@@ -165,40 +445,57 @@ class PowerOfTwoLosersBracket(StandardBracket):
         self.phases = rounds - 1
         self.round_count = self.phases * 2
 
-        # Build bracket
+        # Build bracket and determine placements for losers
         self._build_bracket()
 
-        # Determine placements for losers
+    def _template_key(self):
+        """Return the key of the template of the bracket."""
+        return (type(self), self.winners_round_count)
+
+    def _build_structure(self):
+        """Generate the rounds, the schedule and the placements for losers."""
+        super(PowerOfTwoLosersBracket, self)._build_structure()
         self._generate_loser_placements()
 
-    def _build_bracket(self):
-        """Build the nested list representing the bracket."""
-        Match = self.MatchClass
+    def _make_template(self):
+        """Save the structure of the newly built bracket, with the placements."""
+        template = super(PowerOfTwoLosersBracket, self)._make_template()
+        template['loser_placements'] = self._loser_placements
+        return template
+
+    def _load_template(self, template):
+        """Build the bracket as a copy of a template."""
+        super(PowerOfTwoLosersBracket, self)._load_template(template)
+        self._set_loser_placements(template['loser_placements'])
+
+    def _generate_pairings(self):
+        """Generate the initial pairings of the bracket.
+
+        @return: Lists of the first and second teams of each round
+        @rtype: generator
+        """
         rounds = self.winners_round_count
 
         match_count = 2 ** (rounds - 2)
-        self.matches.append([Match("Match {} Loser".format(2 * i + 1),
-                                   "Match {} Loser".format(2 * i + 2))
-                             for i in range(match_count)])
+        yield (list(map(MatchLoser, range(1, match_count * 2, 2))),
+               list(map(MatchLoser, range(2, match_count * 2 + 1, 2))))
         winners_matches = self._generate_winner_nums(rounds)
         winners_match_index = 0
         losers_match_num = 1
         for __ in range(rounds - 1):
-            round = []
-            for ___ in range(match_count):
-                round.append(Match('Match {} Loser'.format(winners_matches[winners_match_index]),
-                                   'Match L{} Winner'.format(losers_match_num)))
-                winners_match_index += 1
-                losers_match_num += 1
-            self.matches.append(round)
+            yield (list(map(MatchLoser, winners_matches[winners_match_index:
+                                                        winners_match_index + match_count])),
+                   list(map(LosersMatchWinner,
+                            range(losers_match_num, losers_match_num + match_count))))
+            winners_match_index += match_count
+            losers_match_num += match_count
             match_count //= 2
-            round = []
-            for ___ in range(match_count):
-                round.append(Match('Match L{} Winner'.format(losers_match_num),
-                                   'Match L{} Winner'.format(losers_match_num + 1)))
-                losers_match_num += 2
-            self.matches.append(round)
-        del self.matches[-1]
+            if not match_count:
+                break
+            last = losers_match_num + match_count * 2
+            yield (list(map(LosersMatchWinner, range(losers_match_num, last, 2))),
+                   list(map(LosersMatchWinner, range(losers_match_num + 1, last, 2))))
+            losers_match_num = last
 
     def _generate_winner_nums(self, rounds):
         """Generate the list of winners bracket match numbers.
@@ -217,13 +514,15 @@ class PowerOfTwoLosersBracket(StandardBracket):
 
     def _generate_loser_placements(self):
         """Generate the placements for winners bracket losers."""
-        placements = []
-        for phase in range(self.phases):
-            pairs = 2 ** max(self.phases - phase - 2, 0)
-            for pair in range(pairs):
-                placements.append(((phase * 2 + 1), (pair * 2 + 1)))
-                placements.append(((phase * 2 + 1), (pair * 2)))
-        del placements[-2]
+        self._set_loser_placements(loser_placements(self.phases))
+
+    def _set_loser_placements(self, placements):
+        """Set the placements for winners bracket losers.
+
+        @param placements: The (round, match) placement of each loser after
+            the first round, which is only read
+        @type placements: list
+        """
         self._loser_placements = placements
         self._current_loser_placement = self._first_round_loser_placement = 0
         self._first_round_teams = len(placements) + 1
@@ -231,15 +530,13 @@ class PowerOfTwoLosersBracket(StandardBracket):
     def _assign_winner(self, winner):
         """Assign winner to their next match."""
         is_minor = self.index[0] % 2 == 0
+        next_round = self.matches[self.index[0] + 1]
         if is_minor:
-            next_match = self.matches[self.index[0] + 1][self.index[1]]
-            next_match.team2 = winner
+            next_round.set_team2(self.index[1], winner)
+        elif self.index[1] % 2 == 0:
+            next_round.set_team1(self.index[1] // 2, winner)
         else:
-            next_match = self.matches[self.index[0] + 1][self.index[1] // 2]
-            if self.index[1] % 2 == 0:
-                next_match.team1 = winner
-            else:
-                next_match.team2 = winner
+            next_round.set_team2(self.index[1] // 2, winner)
 
     def add_team(self, team):
         """Add a loser from the winners bracket to the losers bracket.
@@ -249,50 +546,56 @@ class PowerOfTwoLosersBracket(StandardBracket):
         """
         if self._first_round_loser_placement < self._first_round_teams:
             index = self._first_round_loser_placement
-            match = self.matches[0][index // 2]
             if index % 2 == 0:
-                match.team1 = team
+                self.matches[0].set_team1(index // 2, team)
             else:
-                match.team2 = team
+                self.matches[0].set_team2(index // 2, team)
             self._first_round_loser_placement += 1
         else:
             position = self._loser_placements[self._current_loser_placement]
-            match = self.matches[position[0]][position[1]]
-            match.team1 = team
+            self.matches[position[0]].set_team1(position[1], team)
             self._current_loser_placement += 1
+        self.version += 1
+
+    def reset(self):
+        """Reset the bracket to its unplayed state.
+
+        The rounds are given their initial pairings again, and their matches
+        are created again when needed.
+        """
+        super(PowerOfTwoLosersBracket, self).reset()
+        self._current_loser_placement = self._first_round_loser_placement = 0
+
+    def _save_state(self):
+        """Save the progress of the bracket.
 
-    def _generate_layout(self):
-        """Generate the bracket layout for display."""
-        space = (None, None)
-        first = 2 ** (self.phases - 1)
-        line_count = first * 5 - 1
-        layout = init_nested_list(line_count)
-        first_team = True
-        match_gen = self._match_for_layout
-        for phase in range(self.phases):
-            first = 2 ** (self.phases - 1)
-            match_num = 0
-            round = phase * 2
-            div = 2 * 2 ** phase
-            for i in range(first):
-                layout[i].append(space)
-            for i in range(first, line_count):
-                (conf, layout_entry) = match_gen(((i - first) % div == 0),
-                                                 round, match_num, first_team)
-                layout[i].append(layout_entry)
-                (match_num, first_team) = conf
-            # Major round
-            match_num = 0
-            first -= 2 ** phase
-            round += 1
-            for i in range(first):
-                layout[i].append(space)
-            for i in range(first, line_count):
-                try:
-                    (conf, layout_entry) = match_gen(((i - first) % div == 0),
-                                                     round, match_num, first_team)
-                    layout[i].append(layout_entry)
-                    (match_num, first_team) = conf
-                except IndexError:
-                    layout[i].append(space)
-        return layout
+        @return: The saved state, to be passed to _restore_state
+        @rtype: tuple
+        """
+        return (super(PowerOfTwoLosersBracket, self)._save_state(),
+                self._first_round_loser_placement, self._current_loser_placement)
+
+    def _restore_state(self, state):
+        """Rewind the bracket to a saved state.
+
+        @param state: A state returned by _save_state
+        @type state: tuple
+        """
+        (bracket_state, self._first_round_loser_placement,
+         self._current_loser_placement) = state
+        super(PowerOfTwoLosersBracket, self)._restore_state(bracket_state)
+
+    def _layout_size(self):
+        """Return the size of the bracket layout."""
+        return (2 ** (self.phases - 1) * 5 - 1, self.round_count)
+
+    def _column_rows(self, column):
+        """Return where the team slots of a column are placed.
+
+        The major round of each phase starts higher up than its minor round.
+        """
+        phase = column // 2
+        first_row = 2 ** (self.phases - 1)
+        if column % 2:
+            first_row -= 2 ** phase
+        return (first_row, 2 * 2 ** phase)
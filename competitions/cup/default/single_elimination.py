@@ -18,7 +18,7 @@
 
 from __future__ import print_function, unicode_literals
 
-from competitions.cup import StandardCup, init_nested_list
+from competitions.cup import MatchWinner, StandardCup
 
 
 class SingleEliminationCup(StandardCup):
@@ -47,99 +47,139 @@ class SingleEliminationCup(StandardCup):
         @type teams: list
         """
         self.teams = teams
-        first_round = self.matches[0]
-        for x in range(len(first_round)):
-            first_round[x].team1 = self.teams[x * 2]
-            first_round[x].team2 = self.teams[x * 2 + 1]
-
-    def _build_bracket(self):
-        """Build the nested list representing the bracket."""
-        Match = self.MatchClass
-        match_count = self.team_count // 2
-        self.matches.append([Match(self.teams[i * 2], self.teams[i * 2 + 1])
-                             for i in range(match_count)])
-        match_num = 1
-        match_count //= 2
-        match_num = self._build_second_round(match_count, match_num)
+        self.matches[0].set_teams(self.teams[0::2], self.teams[1::2])
+        self._invalidate()
+
+    def _template_key(self):
+        """Return the key of the template of the bracket."""
+        return (type(self), self.round_count)
+
+    def clone(self, teams=None):
+        """Create a new, unplayed cup of the same shape."""
+        return type(self)(match_class=self.MatchClass, rounds=self.round_count,
+                          teams=list(self.teams if teams is None else teams))
+
+    def _generate_pairings(self):
+        """Generate the initial pairings of the bracket.
+
+        @return: Lists of the first and second teams of each round
+        @rtype: generator
+        """
+        first_round = (self.teams[0::2], self.teams[1::2])
+        yield first_round
+        if self.round_count < 2:
+            return
+        match_count = self.team_count // 4
+        second_round, match_num = self._second_round_pairings(first_round, match_count, 1)
+        yield second_round
         for __ in range(2, self.round_count):
             match_count //= 2
-            round = []
-            for ___ in range(match_count):
-                round.append(Match('Match {} Winner'.format(match_num),
-                                   'Match {} Winner'.format(match_num + 1)))
-                match_num += 2
-            self.matches.append(round)
-
-    def _build_second_round(self, match_count, match_num):
-        """Build the bracket's second round."""
+            yield self._winner_pairings(match_num, match_count)
+            match_num += match_count * 2
+
+    def _second_round_pairings(self, first_round, match_count, match_num):
+        """Generate the pairings of the bracket's second round.
+
+        @param first_round: The first and second teams of the first round
+        @type first_round: tuple
+        @param match_count: The number of matches in the second round
+        @type match_count: int
+        @param match_num: The number of the first match feeding the round
+        @type match_num: int
+        @return: (pairings, number of the first match feeding the next round)
+        @rtype: tuple
+        """
         raise NotImplementedError
 
+    @staticmethod
+    def _winner_pairings(match_num, match_count):
+        """Generate the pairings of a round between winners of earlier matches.
+
+        @param match_num: The number of the first match feeding the round
+        @type match_num: int
+        @param match_count: The number of matches in the round
+        @type match_count: int
+        @return: Lists of the first and second teams of the round
+        @rtype: tuple
+        """
+        last = match_num + match_count * 2
+        return (list(map(MatchWinner, range(match_num, last, 2))),
+                list(map(MatchWinner, range(match_num + 1, last, 2))))
+
     def _assign_winner(self, winner):
         """Assign winner to their next match."""
-        next_match = self.matches[self.index[0] + 1][self.index[1] // 2]
+        next_round = self.matches[self.index[0] + 1]
         if self.index[1] % 2 == 0:
-            next_match.team1 = winner
+            next_round.set_team1(self.index[1] // 2, winner)
         else:
-            next_match.team2 = winner
-
-    def _generate_layout(self):
-        """Generate the bracket layout for display."""
-        line_count = self.team_count * 2 - 1
-        layout = init_nested_list(line_count)
-        first_team = True
-        match_gen = self._match_for_layout
-        for round in range(self.round_count):
-            match_num = 0
-            div = 2 * 2 ** round
-            mod = div // 2 - 1
-            for i in range(line_count):
-                (conf, layout_entry) = match_gen((i % div == mod),
-                                                 round, match_num,
-                                                 first_team)
-                layout[i].append(layout_entry)
-                (match_num, first_team) = conf
-        return layout
+            next_round.set_team2(self.index[1] // 2, winner)
+
+    def _layout_size(self):
+        """Return the size of the bracket layout."""
+        return (self.team_count * 2 - 1, self.round_count)
+
+    def _column_rows(self, column):
+        """Return where the team slots of a column are placed."""
+        return (2 ** column - 1, 2 ** (column + 1))
 
 
 class StandardSingleEliminationCup(SingleEliminationCup):
 
     """Standard single-elimination cup."""
 
-    def _build_second_round(self, match_count, match_num):
-        """Build the bracket's second round."""
-        Match = self.MatchClass
-        round = []
-        for ___ in range(match_count):
-            teams = []
-            for i in range(2):
-                previous_match = self.matches[0][match_num + i - 1]
-                if not previous_match.is_walkover:
-                    teams.append('Match {} Winner'.format(match_num + i))
-                else:
-                    teams.append(previous_match.team1 or previous_match.team2)
-            round.append(Match(teams[0], teams[1]))
-            match_num += 2
-        self.matches.append(round)
-        return match_num
-
-    def _set_current_match(self):
-        """Set the current match."""
-        super(StandardSingleEliminationCup, self)._set_current_match()
-        while self.current_match.is_walkover:
-            super(StandardSingleEliminationCup, self)._set_current_match()
+    def _second_round_pairings(self, first_round, match_count, match_num):
+        """Generate the pairings of the bracket's second round."""
+        round = ([], [])
+        for x in range(match_count * 2):
+            team1, team2 = first_round[0][x], first_round[1][x]
+            if team1 is not None and team2 is not None:
+                round[x % 2].append(MatchWinner(match_num + x))
+            else:
+                round[x % 2].append(team1 or team2)
+        return round, match_num + match_count * 2
+
+    def _scheduled_matches(self, round_num):
+        """Determine which matches of a round are played, skipping walkovers."""
+        round = self.matches[round_num]
+        match_nums = []
+        for match_num in range(len(round)):
+            team1, team2 = round.teams(match_num)
+            if team1 is not None and team2 is not None:
+                match_nums.append(match_num)
+        return match_nums
+
+    def _walkovers(self, round_num):
+        """List the matches of a round left out of the schedule as walkovers."""
+        round = self.matches[round_num]
+        return [match_num for match_num in range(len(round))
+                if None in round.teams(match_num)]
+
+    def _layout_key(self):
+        """Return the key of the layout skeleton, including the walkovers."""
+        return (super(StandardSingleEliminationCup, self)._layout_key() +
+                (tuple(index for index, team in enumerate(self.teams) if team is None),))
+
+    def update_teams(self, teams):
+        """Update the list of teams and the first-round matches.
+
+        The walkovers in the second round and the schedule are updated too.
+
+        @param teams: The new list of teams
+        @type teams: list
+        """
+        super(StandardSingleEliminationCup, self).update_teams(teams)
+        if self.round_count > 1:
+            second_round, __ = self._second_round_pairings(
+                (teams[0::2], teams[1::2]), self.team_count // 4, 1)
+            self.matches[1].set_teams(*second_round)
+        self._build_schedule()
 
 
 class PowerOfTwoSingleEliminationCup(SingleEliminationCup):
 
     """Standard single-elimination cup for powers of two (4, 8, 16, etc.)."""
 
-    def _build_second_round(self, match_count, match_num):
-        """Build the bracket's second round."""
-        Match = self.MatchClass
-        round = []
-        for ___ in range(match_count):
-            round.append(Match('Match {} Winner'.format(match_num),
-                               'Match {} Winner'.format(match_num + 1)))
-            match_num += 2
-        self.matches.append(round)
-        return match_num
+    def _second_round_pairings(self, first_round, match_count, match_num):
+        """Generate the pairings of the bracket's second round."""
+        return (self._winner_pairings(match_num, match_count),
+                match_num + match_count * 2)
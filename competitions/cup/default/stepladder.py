@@ -18,7 +18,7 @@
 
 from __future__ import print_function, unicode_literals
 
-from competitions.cup import StandardCup
+from competitions.cup import MatchWinner, StandardCup
 
 
 class StepladderCup(StandardCup):
@@ -38,17 +38,19 @@ class StepladderCup(StandardCup):
                                             rounds=(team_count - 1 if team_count
                                                     else len(teams) - 1))
 
-    def _build_bracket(self):
-        """Build the nested list representing the bracket."""
-        Match = self.MatchClass
-        self.matches.append([Match(self.teams[0], self.teams[1])])
+    def _generate_pairings(self):
+        """Generate the initial pairings of the bracket.
+
+        @return: Lists of the first and second teams of each round
+        @rtype: generator
+        """
+        yield ([self.teams[0]], [self.teams[1]])
         for x in range(2, self.team_count):
-            self.matches.append([Match(self.teams[x], 'Match {} Winner'.format(x - 1))])
+            yield ([self.teams[x]], [MatchWinner(x - 1)])
 
     def _assign_winner(self, winner):
         """Assign winner to their next match."""
-        next_match = self.matches[self.index[0] + 1][0]
-        next_match.team2 = winner
+        self.matches[self.index[0] + 1].set_team2(0, winner)
 
     def update_teams(self, teams):
         """Update the list of teams and the seedings.
@@ -57,25 +59,25 @@ class StepladderCup(StandardCup):
         @type teams: list
         """
         self.teams = teams
-        self.matches[0][0].team1 = teams[0]
-        self.matches[0][0].team2 = teams[1]
+        self.matches[0].set_team1(0, teams[0])
+        self.matches[0].set_team2(0, teams[1])
         for x in range(2, self.team_count):
-            self.matches[x - 1][0].team1 = teams[x]
-
-    def _generate_layout(self):
-        """Generate the bracket layout for display."""
-        space = (None, None)
-        line_count = self.team_count + 1
-        layout = [[] for __ in range(line_count)]
-        for round in range(self.round_count):
-            line_num = self.round_count - round - 1
-            for x in range(line_num):
-                layout[x].append(space)
-            layout[line_num].append((self.matches[round][0], 1))
-            line_num += 1
-            layout[line_num].append(space)
-            line_num += 1
-            layout[line_num].append((self.matches[round][0], 2))
-            for x in range(line_num + 1, line_count):
-                layout[x].append(space)
-        return layout
+            self.matches[x - 1].set_team1(0, teams[x])
+        self._invalidate()
+
+    def _template_key(self):
+        """Return the key of the template of the bracket."""
+        return (type(self), self.team_count)
+
+    def clone(self, teams=None):
+        """Create a new, unplayed cup of the same shape."""
+        return type(self)(match_class=self.MatchClass,
+                          teams=list(self.teams if teams is None else teams))
+
+    def _layout_size(self):
+        """Return the size of the bracket layout."""
+        return (self.team_count + 1, self.round_count)
+
+    def _column_rows(self, column):
+        """Return where the team slots of a column are placed."""
+        return (self.round_count - column - 1, 2)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8  -*-
+"""Counters and timings of the matches played in cups."""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division, unicode_literals
+
+from competitions.cup import BracketObserver
+
+
+class LatencyHistogram(object):
+
+    """A histogram of durations in buckets of powers of two microseconds.
+
+    Bucket n counts the durations of less than 2 ** n microseconds that are
+    not counted by an earlier bucket, so bucket 0 holds everything under a
+    microsecond.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self.buckets = []
+        """The counts of the buckets."""
+        self.count = 0
+        """The number of durations."""
+        self.total = 0.0
+        """The sum of the durations, in seconds."""
+        self.max = 0.0
+        """The longest duration, in seconds."""
+
+    def add(self, seconds):
+        """Count a duration.
+
+        @param seconds: The duration
+        @type seconds: float
+        """
+        bucket = int(seconds * 1e6).bit_length()
+        buckets = self.buckets
+        if bucket >= len(buckets):
+            buckets.extend([0] * (bucket + 1 - len(buckets)))
+        buckets[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        """The mean duration, in seconds."""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent):
+        """Estimate a percentile of the durations.
+
+        @param percent: The percentile, from 0 to 100
+        @type percent: float
+        @return: The upper bound of the bucket holding the percentile, in
+            seconds, but no more than the longest duration
+        @rtype: float
+        """
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(2 ** bucket / 1e6, self.max)
+        return self.max
+
+
+class MatchStatistics(BracketObserver):
+
+    """Counts the matches played in a bracket and times their play methods.
+
+    Add it to a bracket with add_observer:
+
+        statistics = MatchStatistics()
+        cup.add_observer(statistics)
+        cup.play_cup()
+        print(statistics.counts['replays'], statistics.play_times.percentile(99))
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self.counts = dict.fromkeys(
+            ('started', 'plays', 'replays', 'walkovers', 'final_replays', 'played'), 0)
+        """The number of each event."""
+        self.play_times = LatencyHistogram()
+        """The time spent in each call of a play method."""
+        self.match_times = LatencyHistogram()
+        """The time spent in the play methods of each match, including replays."""
+        self._match_time = 0.0
+
+    def match_started(self, bracket, match):
+        """Count a started match."""
+        self.counts['started'] += 1
+        self._match_time = 0.0
+
+    def play_timed(self, bracket, match, seconds):
+        """Count a call of a play method and its duration."""
+        self.counts['plays'] += 1
+        self.play_times.add(seconds)
+        self._match_time += seconds
+
+    def match_replayed(self, bracket, match):
+        """Count a match played again."""
+        self.counts['replays'] += 1
+
+    def walkover_skipped(self, bracket, round_num, match_num):
+        """Count a walkover."""
+        self.counts['walkovers'] += 1
+
+    def final_replayed(self, bracket, match):
+        """Count a final played a second time."""
+        self.counts['final_replays'] += 1
+
+    def match_played(self, bracket, match):
+        """Count a played match and the time spent playing it."""
+        self.counts['played'] += 1
+        if self._match_time:
+            self.match_times.add(self._match_time)
+            self._match_time = 0.0
@@ -0,0 +1,497 @@
+# -*- coding: utf-8  -*-
+"""Exact outcome probabilities of cups.
+
+The probabilities are computed from a matrix of win probabilities, where
+C{probabilities[i][j]} is the probability that team i beats team j when team i
+is the first (home) team of the match. Teams are identified by their index in
+the list of teams of the cup.
+"""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division, unicode_literals
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from competitions.cup import BracketObserver
+from competitions.cup.default.single_elimination import SingleEliminationCup
+from competitions.cup.default.stepladder import StepladderCup
+
+
+class CupProbabilities(object):
+
+    """Exact outcome probabilities of a cup for each team."""
+
+    def __init__(self, titles, rounds, wins):
+        """Constructor.
+
+        @param titles: The probability of each team winning the cup
+        @type titles: list
+        @param rounds: The probability of each team reaching each round
+        @type rounds: list
+        @param wins: The expected number of matches won by each team
+        @type wins: list
+        """
+        self.titles = titles
+        """The probability of each team winning the cup."""
+        self.rounds = rounds
+        """The probability of each team reaching each round."""
+        self.wins = wins
+        """The expected number of matches won by each team."""
+
+
+def _play(first, second, probabilities):
+    """Compute the distribution of the winner of a match.
+
+    @param first: The probability of each team being the first team
+    @type first: dict
+    @param second: The probability of each team being the second team
+    @type second: dict
+    @param probabilities: The matrix of win probabilities
+    @type probabilities: list
+    @return: The probability of each team winning the match
+    @rtype: dict
+    """
+    winners = {}
+    for i, p in first.items():
+        row = probabilities[i]
+        winners[i] = p * sum(q * row[j] for j, q in second.items())
+    for j, q in second.items():
+        winners[j] = q * sum(p * (1 - probabilities[i][j]) for i, p in first.items())
+    return winners
+
+
+def _add(totals, distribution):
+    """Add a distribution over teams to a list of totals."""
+    for i, p in distribution.items():
+        totals[i] += p
+
+
+def single_elimination_probabilities(cup, probabilities):
+    """Compute the outcome probabilities of a single-elimination cup.
+
+    Missing teams (None) give their opponents a walkover to the second round,
+    as in StandardSingleEliminationCup.
+
+    @param cup: The cup
+    @type cup: SingleEliminationCup
+    @param probabilities: The matrix of win probabilities
+    @type probabilities: list
+    @rtype: CupProbabilities
+    """
+    rounds = [[0.0] * cup.round_count for __ in cup.teams]
+    wins = [0.0] * cup.team_count
+    slots = [{} if team is None else {i: 1.0} for i, team in enumerate(cup.teams)]
+    for round_num in range(cup.round_count):
+        for slot in slots:
+            for i, p in slot.items():
+                rounds[i][round_num] += p
+        winners = []
+        for match_num in range(len(slots) // 2):
+            first, second = slots[match_num * 2], slots[match_num * 2 + 1]
+            if first and second:
+                winner = _play(first, second, probabilities)
+                _add(wins, winner)
+                winners.append(winner)
+            else:
+                winners.append(first or second)
+        slots = winners
+    titles = [0.0] * cup.team_count
+    _add(titles, slots[0])
+    return CupProbabilities(titles, rounds, wins)
+
+
+def stepladder_probabilities(cup, probabilities):
+    """Compute the outcome probabilities of a stepladder cup.
+
+    @param cup: The cup
+    @type cup: StepladderCup
+    @param probabilities: The matrix of win probabilities
+    @type probabilities: list
+    @rtype: CupProbabilities
+    """
+    rounds = [[0.0] * cup.round_count for __ in cup.teams]
+    wins = [0.0] * cup.team_count
+    holder = {0: 1.0}
+    for round_num in range(cup.round_count):
+        challenger = round_num + 1
+        rounds[challenger][round_num] = 1.0
+        for i, p in holder.items():
+            rounds[i][round_num] += p
+        if round_num == 0:
+            holder = _play(holder, {challenger: 1.0}, probabilities)
+        else:
+            holder = _play({challenger: 1.0}, holder, probabilities)
+        _add(wins, holder)
+    titles = [0.0] * cup.team_count
+    _add(titles, holder)
+    return CupProbabilities(titles, rounds, wins)
+
+
+def _double_elimination_leaf(matrix, offset):
+    """Compute the distribution of a first-round winners bracket match.
+
+    @return: The joint probabilities of the winner and loser, indexed by
+        their position in the match
+    @rtype: numpy.ndarray
+    """
+    p = matrix[offset, offset + 1]
+    return numpy.array([[0.0, p], [1 - p, 0.0]])
+
+
+def _double_elimination_node(matrix, offset, first, second):
+    """Combine two winners bracket subtrees of a double-elimination cup.
+
+    Each subtree is described by the joint probabilities of the winner and
+    loser of its top match and of the losers bracket team coming out of its
+    earlier rounds, indexed by their position in the subtree.
+
+    @param matrix: The matrix of win probabilities
+    @type matrix: numpy.ndarray
+    @param offset: The index of the first team of the combined subtree
+    @type offset: int
+    @param first: The distribution of the first subtree
+    @type first: numpy.ndarray
+    @param second: The distribution of the second subtree
+    @type second: numpy.ndarray
+    @return: The distribution of the combined subtree, and the probability
+        of each team playing in the losers bracket minor round between the
+        two subtrees (None when the subtrees are single matches)
+    @rtype: tuple
+    """
+    n = first.shape[0]
+    block = matrix[offset:offset + 2 * n, offset:offset + 2 * n]
+    p_ab = block[:n, n:]
+    p_ba = block[n:, :n]
+    results = numpy.zeros((n, n, 2 * n))
+    if first.ndim == 2:
+        # Losers of two first-round matches meet in the losers bracket
+        results[:, :, :n] = numpy.einsum('ij,kl,jl->ikj', first, second, p_ab)
+        results[:, :, n:] = numpy.einsum('ij,kl,jl->ikl', first, second, 1 - p_ab)
+        minor = None
+    else:
+        # Each loser meets the losers bracket team from the other subtree
+        # (first: winner, loser, team; second: winner, loser, team)
+        second_wins = numpy.einsum('ijk,mk->ijm', first, p_ba)
+        second_loses = first[:, :, numpy.newaxis, :] * (1 - p_ba)[numpy.newaxis, numpy.newaxis]
+        first_wins = numpy.einsum('jkl,il->jik', second, p_ab)
+        first_loses = second[:, numpy.newaxis, :, :] * (1 - p_ab)[numpy.newaxis, :, numpy.newaxis]
+        # The minor round match is (second subtree match winner, first
+        # subtree match winner), indexed by those two teams
+        pairs = numpy.zeros((n, n, 2 * n, 2 * n))
+        pairs[:, :, n:, :n] = numpy.einsum('ijm,kjm->ikmj', second_wins, first_wins)
+        pairs[:, :, n:, n:] = numpy.einsum('ijm,kjml->ikml', second_wins, first_loses)
+        pairs[:, :, :n, :n] = numpy.einsum('ijmd,kjm->ikdj', second_loses, first_wins)
+        pairs[:, :, :n, n:] = numpy.matmul(
+            second_loses.transpose(0, 3, 1, 2).reshape(n * n, n * n),
+            first_loses.transpose(1, 2, 0, 3).reshape(n * n, n * n)
+        ).reshape(n, n, n, n).transpose(0, 2, 1, 3)
+        results = (numpy.einsum('abij,ij->abi', pairs, block) +
+                   numpy.einsum('abij,ij->abj', pairs, 1 - block))
+        minor = pairs.sum(axis=(0, 1, 3)) + pairs.sum(axis=(0, 1, 2))
+    combined = numpy.zeros((2 * n, 2 * n, 2 * n))
+    combined[:n, n:] = results * p_ab[:, :, numpy.newaxis]
+    combined[n:, :n] = (results * (1 - p_ab)[:, :, numpy.newaxis]).transpose(1, 0, 2)
+    return combined, minor
+
+
+def double_elimination_probabilities(cup, probabilities):
+    """Compute the outcome probabilities of a double-elimination cup.
+
+    The winners bracket losers are placed in the losers bracket as in
+    PowerOfTwoLosersBracket, and the final is replayed if the cup requires a
+    double win. The rounds are those of the winners bracket, followed by
+    those of the losers bracket and the final.
+
+    This function requires NumPy. Its cost grows with the sixth power of
+    the number of teams, which is a fraction of a second for 64 teams.
+
+    @param cup: The cup
+    @type cup: PowerOfTwoDoubleEliminationCup
+    @param probabilities: The matrix of win probabilities
+    @type probabilities: list
+    @rtype: CupProbabilities
+    @raise ImportError: If NumPy is not installed
+    """
+    if numpy is None:
+        raise ImportError('NumPy is required for double-elimination probabilities')
+    matrix = numpy.asarray(probabilities, dtype=float)
+    team_count = cup.team_count
+    rounds = cup.round_count
+    winners_bracket = single_elimination_probabilities(cup.winners_bracket, matrix)
+    losers_rounds = numpy.zeros((team_count, 2 * rounds - 2))
+    # Winners bracket first round losers
+    level = [_double_elimination_leaf(matrix, offset) for offset in range(0, team_count, 2)]
+    for offset, leaf in zip(range(0, team_count, 2), level):
+        losers_rounds[offset:offset + 2, 0] = leaf.sum(axis=0)
+    for level_num in range(1, rounds):
+        size = 2 ** (level_num + 1)
+        nodes = []
+        for index in range(len(level) // 2):
+            offset = index * size
+            node, minor = _double_elimination_node(matrix, offset,
+                                                   level[index * 2], level[index * 2 + 1])
+            if minor is not None:
+                losers_rounds[offset:offset + size, 2 * level_num - 2] = minor
+            # Major round: the loser of this node and its losers bracket team
+            losers_rounds[offset:offset + size, 2 * level_num - 1] = (node.sum(axis=(0, 2)) +
+                                                                     node.sum(axis=(0, 1)))
+            nodes.append(node)
+        level = nodes
+    root = level[0]
+    # Losers bracket final, then the final against the winners bracket winner
+    finals = (numpy.einsum('wld,ld->wl', root, matrix) +
+              numpy.einsum('wld,ld->wd', root, 1 - matrix))
+    first_final = matrix * finals
+    if cup.require_double_win:
+        winners_titles = (first_final + (finals - first_final) * matrix).sum(axis=1)
+        losers_titles = (finals * (1 - matrix) ** 2).sum(axis=0)
+        final_wins = first_final.sum(axis=1) + ((finals - first_final) * matrix).sum(axis=1)
+        final_wins += (finals - first_final).sum(axis=0) + losers_titles
+    else:
+        winners_titles = first_final.sum(axis=1)
+        losers_titles = (finals - first_final).sum(axis=0)
+        final_wins = winners_titles + losers_titles
+    titles = winners_titles + losers_titles
+    winners_champions = finals.sum(axis=1)
+    losers_champions = finals.sum(axis=0)
+    # Every team entering the losers bracket wins one match fewer than it
+    # plays there, unless it wins the losers bracket
+    wins = (numpy.asarray(winners_bracket.wins) + losers_rounds.sum(axis=1) -
+            (1 - winners_champions - losers_champions) + final_wins)
+    all_rounds = numpy.concatenate((numpy.asarray(winners_bracket.rounds), losers_rounds,
+                                    (winners_champions + losers_champions)[:, numpy.newaxis]),
+                                   axis=1)
+    return CupProbabilities(titles.tolist(), all_rounds.tolist(), wins.tolist())
+
+
+class LiveOdds(BracketObserver):
+
+    """Title probabilities of a cup, updated as its matches are played.
+
+    The odds observe the cup, and after each match only the probabilities
+    that the match can change are computed again. Changes to the cup other
+    than playing a match, like resetting it, make the odds start over.
+
+    This class requires NumPy.
+    """
+
+    def __init__(self, cup, probabilities):
+        """Constructor.
+
+        @param cup: The cup
+        @type cup: Cup
+        @param probabilities: The matrix of win probabilities
+        @type probabilities: array-like
+        @raise ImportError: If NumPy is not installed
+        """
+        if numpy is None:
+            raise ImportError('NumPy is required for live odds')
+        self.cup = cup
+        """The cup."""
+        self._matrix = numpy.asarray(probabilities, dtype=float)
+        self._losing = 1 - self._matrix
+        self.refresh()
+        cup.add_observer(self)
+
+    @property
+    def titles(self):
+        """The probability of each team winning the cup, given the matches played."""
+        if self.cup.version != self._version:
+            self.refresh()
+        return self._titles
+
+    def refresh(self):
+        """Compute the odds from the current state of the cup."""
+        self._compute()
+        self._version = self.cup.version
+
+    def match_played(self, bracket, match):
+        """Update the odds after a match of the cup.
+
+        @param bracket: The cup
+        @type bracket: Cup
+        @param match: The played match
+        @type match: Match
+        """
+        if bracket.version != self._version + 1:
+            self.refresh()
+            return
+        self._version = bracket.version
+        self._update(bracket.index[0], bracket.index[1], match.winner == match.team1)
+
+    def detach(self):
+        """Stop following the matches of the cup."""
+        self.cup.remove_observer(self)
+
+    def _compute(self):
+        """Compute all of the odds."""
+        raise NotImplementedError
+
+    def _update(self, round_num, match_num, first_won):
+        """Compute again the odds changed by a played match.
+
+        @param round_num: The round of the match
+        @type round_num: int
+        @param match_num: The number of the match in its round
+        @type match_num: int
+        @param first_won: Whether the first team won the match
+        @type first_won: bool
+        """
+        raise NotImplementedError
+
+    def _played(self):
+        """Find the played matches of the cup.
+
+        @return: The (round number, match number) of each played match
+        @rtype: generator
+        """
+        cup = self.cup
+        schedule = cup.schedule
+        return zip(schedule.round_nums[:cup._next_fixture], schedule.match_nums[:cup._next_fixture])
+
+
+class SingleEliminationLiveOdds(LiveOdds):
+
+    """Live title probabilities of a single-elimination cup.
+
+    The winner of each match is described by the probability of each team
+    of its subtree, so a played match only changes the matches on its path to
+    the final. Missing teams (None) give their opponents a walkover.
+    """
+
+    def _compute(self):
+        """Compute all of the odds."""
+        cup = self.cup
+        played = {}
+        for round_num, match_num in self._played():
+            match = cup.matches[round_num][match_num]
+            played[(round_num, match_num)] = match.winner == match.team1
+        self._winners = [[self._zero_slot(team) for team in cup.teams]]
+        for round_num in range(cup.round_count):
+            self._winners.append([None] * (len(self._winners[round_num]) // 2))
+            for match_num in range(len(self._winners[round_num + 1])):
+                self._set_winner(round_num, match_num, played.get((round_num, match_num)))
+        self._titles = self._winners[-1][0].tolist()
+
+    @staticmethod
+    def _zero_slot(team):
+        """Return the distribution of a first-round slot."""
+        return numpy.zeros(1) if team is None else numpy.ones(1)
+
+    def _set_winner(self, round_num, match_num, first_won):
+        """Compute the distribution of the winner of a match.
+
+        @param first_won: Whether the first team won the match, or None if
+            the match has not been played
+        @type first_won: bool
+        """
+        slots = self._winners[round_num]
+        first, second = slots[match_num * 2], slots[match_num * 2 + 1]
+        if first_won is not None:
+            winner = (numpy.concatenate((first, numpy.zeros_like(second))) if first_won
+                      else numpy.concatenate((numpy.zeros_like(first), second)))
+        elif first.any() and second.any():
+            size = len(first)
+            offset = match_num * size * 2
+            home = self._matrix[offset:offset + size, offset + size:offset + size * 2]
+            away = self._losing[offset:offset + size, offset + size:offset + size * 2]
+            winner = numpy.concatenate((first * home.dot(second), second * first.dot(away)))
+        else:
+            winner = numpy.concatenate((first, second))
+        self._winners[round_num + 1][match_num] = winner
+
+    def _update(self, round_num, match_num, first_won):
+        """Compute again the matches on the path of a played match to the final."""
+        self._set_winner(round_num, match_num, first_won)
+        for round_num in range(round_num + 1, self.cup.round_count):
+            match_num //= 2
+            self._set_winner(round_num, match_num, None)
+        self._titles = self._winners[-1][0].tolist()
+
+
+class StepladderLiveOdds(LiveOdds):
+
+    """Live title probabilities of a stepladder cup.
+
+    Only the holder of the last played match is kept, so a played match
+    changes the rounds after it.
+    """
+
+    def _compute(self):
+        """Compute all of the odds."""
+        # Views of the possible holders before each challenger and of the
+        # matching rows of the matrices, so each round is two vector operations
+        self._holders = numpy.zeros(self.cup.team_count)
+        self._views = [(self._holders[:challenger], self._matrix[challenger, :challenger],
+                        self._losing[challenger, :challenger])
+                       for challenger in range(self.cup.team_count)]
+        matches = self.cup.matches
+        self._holder = None
+        for round_num, __ in self._played():
+            match = matches[round_num][0]
+            self._move_holder(round_num, match.winner == match.team1)
+        self._finish()
+
+    def _update(self, round_num, match_num, first_won):
+        """Compute again the rounds after a played match."""
+        self._move_holder(round_num, first_won)
+        self._finish()
+
+    def _move_holder(self, round_num, first_won):
+        """Note the index of the team holding the cup after a round."""
+        if first_won:
+            self._holder = 0 if round_num == 0 else round_num + 1
+        elif round_num == 0:
+            self._holder = 1
+
+    def _finish(self):
+        """Play the remaining rounds after the holder of the last played match."""
+        holders = self._holders
+        holders.fill(0.0)
+        if self._holder is None:
+            holders[0], holders[1] = self._matrix[0, 1], self._losing[0, 1]
+            first = 2
+        else:
+            holders[self._holder] = 1.0
+            first = self.cup._next_fixture + 1
+        views = self._views
+        for challenger in range(first, len(holders)):
+            before, winning, losing = views[challenger]
+            holders[challenger] = before.dot(winning)
+            before *= losing
+        self._titles = holders.tolist()
+
+
+def live_odds(cup, probabilities):
+    """Follow the title probabilities of a cup as its matches are played.
+
+    @param cup: The cup
+    @type cup: SingleEliminationCup or StepladderCup
+    @param probabilities: The matrix of win probabilities
+    @type probabilities: array-like
+    @rtype: LiveOdds
+    @raise TypeError: If live odds are not available for the cup
+    @raise ImportError: If NumPy is not installed
+    """
+    if isinstance(cup, SingleEliminationCup):
+        return SingleEliminationLiveOdds(cup, probabilities)
+    if isinstance(cup, StepladderCup):
+        return StepladderLiveOdds(cup, probabilities)
+    raise TypeError('Live odds are not available for {}'.format(type(cup).__name__))
@@ -0,0 +1,148 @@
+# -*- coding: utf-8  -*-
+"""Scheduling the matches of a cup as soon as they can be played."""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+
+class Scheduler(object):
+
+    """Hands out the matches of a cup as soon as their teams are decided.
+
+    The matches left in the cup form a dependency graph, in which a match
+    waits for the earlier matches whose winners or losers it is played
+    between. ready() hands out the matches that can be played, and
+    complete() takes the result of a played match and passes its winner and
+    loser on to the matches waiting for them.
+
+    Matches may be completed in any order, so a losers bracket match can be
+    played while the winners bracket round before it in the schedule is
+    still going on. The cup records the results in schedule order, as soon
+    as every earlier match of the schedule is complete, so its state and
+    its observers see the same sequence of results as with step().
+    """
+
+    def __init__(self, cup):
+        """Constructor.
+
+        @param cup: The cup, which should not be played otherwise while it
+            is scheduled
+        @type cup: Bracket
+        """
+        self.cup = cup
+        """The cup."""
+        schedule = cup.schedule
+        first = cup._next_fixture
+        positions = {}
+        for position in range(len(schedule) - first):
+            positions[schedule[first + position]] = position
+        self._waiting = {}
+        self._dependents = {}
+        self._ready = []
+        for entry, position in positions.items():
+            waiting = 0
+            for team_num, source, loser in cup._fixture_sources(*entry):
+                source = positions.get(source)
+                if source is not None:
+                    self._dependents.setdefault(source, []).append((position, team_num, loser))
+                    waiting += 1
+            if waiting:
+                self._waiting[position] = waiting
+            else:
+                self._ready.append(position)
+        self._first = first
+        self._in_play = {}
+        self._legs = {}
+        self._complete = set()
+
+    @property
+    def finished(self):
+        """Whether the cup is finished."""
+        return self.cup.finished
+
+    @property
+    def in_play(self):
+        """The number of matches handed out and not yet completed."""
+        return len(self._in_play)
+
+    def _entry(self, position):
+        """Return the schedule entry at a position relative to the first one."""
+        return self.cup.schedule[self._first + position]
+
+    def ready(self):
+        """Hand out the matches whose teams are all decided.
+
+        Each match is handed out once, unless it has to be played again.
+
+        @return: The matches, in schedule order
+        @rtype: list
+        """
+        matches = []
+        for position in sorted(self._ready):
+            bracket, round_num, match_num = self._entry(position)
+            match = bracket.matches[round_num][match_num]
+            self._in_play[id(match)] = position
+            matches.append(match)
+        self._ready = []
+        return matches
+
+    def plays_once(self, match):
+        """Whether a match handed out by ready() is to be played only once.
+
+        Such a match, like the final of a double-elimination cup, may be
+        drawn. complete() hands it out again if it has to be replayed.
+
+        @param match: The match
+        @type match: Match
+        @rtype: bool
+        """
+        bracket, __, __ = self._entry(self._in_play[id(match)])
+        return self.cup._plays_once(bracket)
+
+    def complete(self, match):
+        """Take the result of a match handed out by ready().
+
+        @param match: The played match, which has a winner
+        @type match: Match
+        @raise ValueError: If the match is not in play
+        """
+        position = self._in_play.pop(id(match), None)
+        if position is None:
+            raise ValueError('Match is not in play')
+        cup = self.cup
+        bracket, round_num, match_num = self._entry(position)
+        leg = self._legs.get(position, 0)
+        if cup._replay_fixture(bracket, match, leg):
+            self._legs[position] = leg + 1
+            self._ready.append(position)
+            return
+        for dependent, team_num, loser in self._dependents.pop(position, ()):
+            dependent_bracket, dependent_round, dependent_match = self._entry(dependent)
+            round = dependent_bracket.matches[dependent_round]
+            team = match.loser if loser else match.winner
+            if team_num == 1:
+                round.set_team1(dependent_match, team)
+            else:
+                round.set_team2(dependent_match, team)
+            self._waiting[dependent] -= 1
+            if not self._waiting[dependent]:
+                del self._waiting[dependent]
+                self._ready.append(dependent)
+        self._complete.add(position)
+        while cup._next_fixture - self._first in self._complete:
+            self._complete.remove(cup._next_fixture - self._first)
+            cup._advance(True)
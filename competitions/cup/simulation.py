@@ -0,0 +1,174 @@
+# -*- coding: utf-8  -*-
+"""Repeated simulation of cups."""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division, unicode_literals
+
+import multiprocessing
+import random
+
+
+class SimulationResults(object):
+
+    """Aggregated results of repeated cup simulations."""
+
+    def __init__(self):
+        """Constructor."""
+        self.runs = 0
+        """The number of simulated cups."""
+        self.titles = {}
+        """The number of titles won by each team."""
+        self.rounds = {}
+        """The number of times each team reached each round."""
+
+    def add(self, winner, round_teams):
+        """Add the results of a single simulated cup.
+
+        @param winner: The winner of the cup
+        @type winner: The type of teams in the cup
+        @param round_teams: The teams taking part in each round
+        @type round_teams: list
+        """
+        self.runs += 1
+        self.titles[winner] = self.titles.get(winner, 0) + 1
+        rounds = self.rounds
+        round_count = len(round_teams)
+        for round_num, teams in enumerate(round_teams):
+            for team in teams:
+                counts = rounds.get(team)
+                if counts is None:
+                    counts = rounds[team] = [0] * round_count
+                counts[round_num] += 1
+
+    def merge(self, other):
+        """Add the results of another set of simulations.
+
+        @param other: The results to add
+        @type other: SimulationResults
+        """
+        self.runs += other.runs
+        for team, count in other.titles.items():
+            self.titles[team] = self.titles.get(team, 0) + count
+        for team, other_counts in other.rounds.items():
+            counts = self.rounds.get(team)
+            if counts is None:
+                self.rounds[team] = list(other_counts)
+            else:
+                for round_num, count in enumerate(other_counts):
+                    counts[round_num] += count
+
+    def title_probability(self, team):
+        """Return the estimated probability of a team winning the cup.
+
+        @param team: The team
+        @type team: The type of teams in the cup
+        @return: The probability, or 0.0 if no cups have been simulated
+        @rtype: float
+        """
+        if not self.runs:
+            return 0.0
+        return self.titles.get(team, 0) / self.runs
+
+    def round_probability(self, team, round_num):
+        """Return the estimated probability of a team reaching a round.
+
+        @param team: The team
+        @type team: The type of teams in the cup
+        @param round_num: The index of the round
+        @type round_num: int
+        @return: The probability, or 0.0 if no cups have been simulated
+        @rtype: float
+        """
+        counts = self.rounds.get(team)
+        if not counts or not self.runs:
+            return 0.0
+        return counts[round_num] / self.runs
+
+
+_worker_cup = None
+
+
+def _init_worker(cup):
+    """Store the cup to be simulated by a worker process."""
+    global _worker_cup
+    _worker_cup = cup
+
+
+def _simulate_chunk(chunk):
+    """Simulate a chunk of runs of the worker's cup.
+
+    @param chunk: (seed, number of runs)
+    @type chunk: tuple
+    @rtype: SimulationResults
+    """
+    seed, runs = chunk
+    random.seed(seed)
+    return _worker_cup.simulate(runs)
+
+
+def _chunks(runs, seed, chunk_size):
+    """Split a number of runs into seeded chunks.
+
+    The seed of each chunk depends only on the base seed and its position,
+    not on the number of workers.
+    """
+    for index, start in enumerate(range(0, runs, chunk_size)):
+        yield ('{}-{}'.format(seed, index), min(chunk_size, runs - start))
+
+
+def simulate_parallel(cup, runs, processes=None, seed=0, chunk_size=1000):
+    """Simulate a cup repeatedly using a pool of worker processes.
+
+    The runs are split into chunks, each of which seeds the random module
+    before being played, so the results are the same for any number of
+    processes as long as the match class draws from the random module.
+    With a single process, the runs are played in this process on a fork
+    of the cup, and the state of the random module is restored afterwards.
+
+    @param cup: The cup to simulate, which must be picklable
+    @type cup: Cup
+    @param runs: The number of times to play the cup
+    @type runs: int
+    @param processes: The number of worker processes (default: CPU count)
+    @type processes: int
+    @param seed: The base random seed
+    @type seed: int or str
+    @param chunk_size: The number of runs in each chunk
+    @type chunk_size: int
+    @return: The merged results of every run
+    @rtype: SimulationResults
+    """
+    results = SimulationResults()
+    chunks = _chunks(runs, seed, chunk_size)
+    if processes == 1:
+        state = random.getstate()
+        _init_worker(cup.fork())
+        try:
+            for chunk in chunks:
+                results.merge(_simulate_chunk(chunk))
+        finally:
+            _init_worker(None)
+            random.setstate(state)
+        return results
+    pool = multiprocessing.Pool(processes, _init_worker, (cup,))
+    try:
+        for chunk_results in pool.imap(_simulate_chunk, chunks):
+            results.merge(chunk_results)
+    finally:
+        pool.close()
+        pool.join()
+    return results
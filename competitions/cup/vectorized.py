@@ -0,0 +1,155 @@
+# -*- coding: utf-8  -*-
+"""Vectorized simulation of cups using NumPy.
+
+These simulators play many cups at once from a matrix of win probabilities,
+where C{probabilities[i][j]} is the probability that team i beats team j when
+team i is the first (home) team of the match. Teams are identified by their
+index in the list of teams of the corresponding cup.
+"""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division, unicode_literals
+
+import numpy
+
+from competitions.cup.default.poweroftwo_double import loser_placements
+
+
+def _probability_matrix(probabilities):
+    """Convert and validate a matrix of win probabilities.
+
+    @param probabilities: The matrix of win probabilities
+    @type probabilities: array-like
+    @return: The matrix and the number of rounds of a power-of-two bracket
+    @rtype: tuple
+    @raise ValueError: If the number of teams is not a power of two
+    """
+    matrix = numpy.asarray(probabilities, dtype=float)
+    team_count = matrix.shape[0]
+    rounds = team_count.bit_length() - 1
+    if matrix.shape != (team_count, team_count) or team_count < 2 or 2 ** rounds != team_count:
+        raise ValueError('Wrong number of teams')
+    return matrix, rounds
+
+
+def _play(matrix, team1, team2, rng):
+    """Play one match in each of many cups.
+
+    @param matrix: The matrix of win probabilities
+    @type matrix: numpy.ndarray
+    @param team1: The first teams
+    @type team1: numpy.ndarray
+    @param team2: The second teams
+    @type team2: numpy.ndarray
+    @param rng: The random number generator
+    @type rng: numpy.random.Generator
+    @return: (winners, losers)
+    @rtype: tuple
+    """
+    first_wins = rng.random(team1.shape) < matrix[team1, team2]
+    return (numpy.where(first_wins, team1, team2),
+            numpy.where(first_wins, team2, team1))
+
+
+def simulate_single_elimination(probabilities, runs, seed=None):
+    """Simulate many single-elimination cups for powers of two at once.
+
+    The bracket is the one of PowerOfTwoSingleEliminationCup, with one
+    array operation per round for all cups.
+
+    @param probabilities: The matrix of win probabilities
+    @type probabilities: array-like
+    @param runs: The number of cups to simulate
+    @type runs: int
+    @param seed: A seed or generator for the random numbers
+    @type seed: int or numpy.random.Generator
+    @return: (champions, rounds): the index of the winner of each cup, and
+        the number of rounds each team won in each cup (the champion wins
+        every round)
+    @rtype: tuple
+    @raise ValueError: If the number of teams is not a power of two
+    """
+    matrix, rounds = _probability_matrix(probabilities)
+    rng = numpy.random.default_rng(seed)
+    team_count = matrix.shape[0]
+    runs_index = numpy.arange(runs)[:, numpy.newaxis]
+    reached = numpy.zeros((runs, team_count), dtype=numpy.uint8)
+    alive = numpy.tile(numpy.arange(team_count, dtype=numpy.int32), (runs, 1))
+    for __ in range(rounds):
+        alive, __ = _play(matrix, alive[:, 0::2], alive[:, 1::2], rng)
+        reached[runs_index, alive] += 1
+    return alive[:, 0], reached
+
+
+def simulate_double_elimination(probabilities, runs, require_double_win=True, seed=None):
+    """Simulate many double-elimination cups for powers of two at once.
+
+    The brackets and the placement of winners bracket losers are those of
+    PowerOfTwoDoubleEliminationCup. If require_double_win is set and the
+    winners bracket champion loses the final, the final is played again.
+
+    @param probabilities: The matrix of win probabilities
+    @type probabilities: array-like
+    @param runs: The number of cups to simulate
+    @type runs: int
+    @param require_double_win: Whether the final is replayed if the losers
+        bracket champion wins it
+    @type require_double_win: bool
+    @param seed: A seed or generator for the random numbers
+    @type seed: int or numpy.random.Generator
+    @return: (champions, finalists, wins): the index of the winner of each
+        cup, the winners and losers bracket champions of each cup and the
+        number of matches won by each team in each cup
+    @rtype: tuple
+    @raise ValueError: If the number of teams is less than four or not a
+        power of two
+    """
+    matrix, rounds = _probability_matrix(probabilities)
+    if rounds < 2:
+        raise ValueError('Not enough rounds.')
+    rng = numpy.random.default_rng(seed)
+    team_count = matrix.shape[0]
+    runs_index = numpy.arange(runs)[:, numpy.newaxis]
+    wins = numpy.zeros((runs, team_count), dtype=numpy.uint8)
+
+    def play(team1, team2):
+        winners, losers = _play(matrix, team1, team2, rng)
+        wins[runs_index, winners] += 1
+        return winners, losers
+
+    # Winners bracket first round, whose losers pair up in the losers bracket
+    teams = numpy.tile(numpy.arange(team_count, dtype=numpy.int32), (runs, 1))
+    alive, losers = play(teams[:, 0::2], teams[:, 1::2])
+    surviving = play(losers[:, 0::2], losers[:, 1::2])[0]
+    placements = iter(loser_placements(rounds - 1))
+    for __ in range(1, rounds):
+        # Winners bracket round, whose losers meet the losers bracket survivors
+        alive, losers = play(alive[:, 0::2], alive[:, 1::2])
+        dropped = numpy.empty_like(losers)
+        for loser in range(losers.shape[1]):
+            dropped[:, next(placements)[1]] = losers[:, loser]
+        surviving = play(dropped, surviving)[0]
+        if surviving.shape[1] > 1:
+            surviving = play(surviving[:, 0::2], surviving[:, 1::2])[0]
+    finalists = numpy.concatenate((alive, surviving), axis=1)
+    champions, __ = play(alive, surviving)
+    if require_double_win:
+        replayed = numpy.flatnonzero(champions[:, 0] != alive[:, 0])
+        replay_winners, __ = _play(matrix, alive[replayed, 0], surviving[replayed, 0], rng)
+        wins[replayed, replay_winners] += 1
+        champions[replayed, 0] = replay_winners
+    return champions[:, 0], finalists, wins
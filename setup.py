@@ -44,6 +44,8 @@ setup(
 
         'License :: OSI Approved :: GNU Lesser General Public License v3 or later (LGPLv3+)',
 
+        # competitions.cup.aio, used by play_round_async and play_cup_async,
+        # needs Python 3.5 or later; the rest of the package runs on all of these
         'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3.2',
         'Programming Language :: Python :: 3.3',
@@ -60,4 +62,8 @@ setup(
     test_suite='tests',
 
     install_requires=['competitions-match>=0.3'],
+
+    extras_require={
+        'vectorized': ['numpy>=1.17'],
+    },
 )
@@ -21,6 +21,8 @@ from __future__ import unicode_literals
 import sys
 import unittest
 
+from competitions.match import TwoTeamMatch
+
 
 PY2 = sys.version_info.major == 2
 PY3 = sys.version_info.major == 3
@@ -35,3 +37,23 @@ class TestCase(unittest.TestCase):
         def assertCountEqual(self, *args, **kwargs):
             """Wrapper of assertItemsEqual()."""
             return self.assertItemsEqual(*args, **kwargs)
+
+
+class MatrixMatch(TwoTeamMatch):
+
+    """A deterministic match simulator driven by a 0-1 probability matrix.
+
+    Teams are numbered from 1, so the team numbered n has index n - 1.
+    """
+
+    matrix = None
+
+    def play(self):
+        """Play the match."""
+        if self.matrix[self.team1 - 1][self.team2 - 1]:
+            self.winner, self.loser = self.team1, self.team2
+            self.score1, self.score2 = 1, 0
+        else:
+            self.winner, self.loser = self.team2, self.team1
+            self.score1, self.score2 = 0, 1
+        return self.winner
@@ -0,0 +1,127 @@
+# -*- coding: utf-8  -*-
+"""Tests for playing cups with asyncio."""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import sys
+import unittest
+
+from . import TestCase
+
+from competitions.cup.default.poweroftwo_double import PowerOfTwoDoubleEliminationCup
+from competitions.cup.default.single_elimination import (
+    PowerOfTwoSingleEliminationCup, StandardSingleEliminationCup
+)
+from competitions.cup.default.stepladder import StepladderCup
+from competitions.match.default.TestMatch import TestMatch
+
+# competitions.cup.aio uses async def, which is a syntax error before 3.5
+if sys.version_info < (3, 5):
+    asyncio = aio = None
+else:
+    import asyncio
+    from competitions.cup import aio
+
+
+class ServiceMatch(TestMatch):
+
+    """A test match whose result comes from a stand-in scoring service."""
+
+    log = []
+
+    def play(self):
+        """Start the match, returning a future of the winner."""
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self.log.append(('start', self.team1))
+
+        def finish():
+            future.set_result(super(ServiceMatch, self).play())
+            self.log.append(('finish', self.team1))
+
+        loop.call_later(0.01, finish)
+        return future
+
+
+def run(coroutine):
+    """Run a coroutine in a new event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@unittest.skipIf(aio is None, 'Python 3.5 or later is needed')
+class TestAsyncPlay(TestCase):
+
+    """Tests for playing cups with asyncio."""
+
+    def setUp(self):
+        """Clear the log of played matches."""
+        del ServiceMatch.log[:]
+
+    def test_concurrent_round(self):
+        """Test that the matches of a round are played concurrently."""
+        cup = PowerOfTwoSingleEliminationCup(match_class=ServiceMatch, rounds=3)
+        matches = run(cup.play_round_async())
+        self.assertListEqual(matches, list(cup.matches[0]), 'Wrong matches played.')
+        self.assertListEqual([event for event, __ in ServiceMatch.log[:4]], ['start'] * 4,
+                             'Matches not played concurrently.')
+        self.assertEqual(cup.matches[1][0].team2, 'Team 3', 'Winner not moved on.')
+        self.assertEqual(cup.matches[1][1].team2, 'Team 7', 'Winner not moved on.')
+        self.assertEqual(len(run(cup.play_round_async())), 2, 'Wrong round played.')
+
+    def assert_same_play(self, make_cup):
+        """Check that a cup played asynchronously matches one played normally."""
+        cup = make_cup(ServiceMatch)
+        expected = make_cup(TestMatch)
+        self.assertEqual(run(cup.play_cup_async()), expected.play_cup(), 'Wrong winner.')
+        self.assertEqual(cup.print_cup(display=False), expected.print_cup(display=False))
+        self.assertIsNone(cup.step(), 'Matches left to play.')
+
+    def test_single_elimination(self):
+        """Test playing single-elimination cups."""
+        self.assert_same_play(lambda match_class: PowerOfTwoSingleEliminationCup(
+            match_class=match_class, rounds=4))
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        teams[2] = None
+        self.assert_same_play(lambda match_class: StandardSingleEliminationCup(
+            match_class=match_class, rounds=3, teams=teams))
+
+    def test_stepladder(self):
+        """Test playing a stepladder cup."""
+        self.assert_same_play(lambda match_class: StepladderCup(
+            match_class=match_class, team_count=5))
+
+    def test_double_elimination(self):
+        """Test playing a double-elimination cup, including the replayed final."""
+        self.assert_same_play(lambda match_class: PowerOfTwoDoubleEliminationCup(
+            match_class=match_class, rounds=3))
+        cup = PowerOfTwoDoubleEliminationCup(match_class=ServiceMatch, rounds=2)
+        for __ in range(4):
+            run(cup.play_round_async())
+        cup.final.team1, cup.final.team2 = cup.final.team2, cup.final.team1
+        self.assertListEqual(run(cup.play_round_async()), [cup.final])
+        self.assertEqual(cup.winner, 'Team 3', 'Final not replayed.')
+        self.assertEqual(cup.final_scores[1], (5, 0), 'Replay not recorded.')
+
+    def test_blocking_matches(self):
+        """Test that matches whose play method blocks can be played too."""
+        cup = PowerOfTwoSingleEliminationCup(match_class=TestMatch, rounds=3)
+        self.assertEqual(run(aio.play_cup(cup)), 'Team 1', 'Cup has wrong winner.')
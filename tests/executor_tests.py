@@ -0,0 +1,114 @@
+# -*- coding: utf-8  -*-
+"""Tests for playing cups in an executor."""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import threading
+import time
+import unittest
+
+from . import TestCase
+
+from competitions.cup.default.poweroftwo_double import PowerOfTwoDoubleEliminationCup
+from competitions.cup.default.single_elimination import (
+    PowerOfTwoSingleEliminationCup, StandardSingleEliminationCup
+)
+from competitions.cup.default.stepladder import StepladderCup
+from competitions.match.default.TestMatch import TestMatch
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+
+class SlowMatch(TestMatch):
+
+    """A test match that blocks while it is played."""
+
+    lock = threading.Lock()
+    playing = 0
+    most_playing = 0
+
+    def play(self):
+        """Play the match, keeping count of the matches played at once."""
+        with self.lock:
+            SlowMatch.playing += 1
+            SlowMatch.most_playing = max(SlowMatch.most_playing, SlowMatch.playing)
+        time.sleep(0.01)
+        with self.lock:
+            SlowMatch.playing -= 1
+        return super(SlowMatch, self).play()
+
+
+@unittest.skipIf(ThreadPoolExecutor is None, 'concurrent.futures is not available')
+class TestExecutorPlay(TestCase):
+
+    """Tests for playing cups in an executor."""
+
+    def setUp(self):
+        """Reset the count of matches played at once."""
+        SlowMatch.most_playing = 0
+
+    def assert_same_play(self, make_cup):
+        """Check that a cup played in threads matches one played normally."""
+        cup = make_cup(SlowMatch)
+        expected = make_cup(TestMatch)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertEqual(cup.play_cup(executor), expected.play_cup(), 'Wrong winner.')
+        self.assertEqual(cup.print_cup(display=False), expected.print_cup(display=False))
+        self.assertIsNone(cup.step(), 'Matches left to play.')
+
+    def test_single_elimination(self):
+        """Test playing single-elimination cups."""
+        self.assert_same_play(lambda match_class: PowerOfTwoSingleEliminationCup(
+            match_class=match_class, rounds=4))
+        self.assertEqual(SlowMatch.most_playing, 8, 'Round not played at once.')
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        teams[5] = None
+        self.assert_same_play(lambda match_class: StandardSingleEliminationCup(
+            match_class=match_class, rounds=3, teams=teams))
+
+    def test_stepladder(self):
+        """Test playing a stepladder cup."""
+        self.assert_same_play(lambda match_class: StepladderCup(
+            match_class=match_class, team_count=5))
+        self.assertEqual(SlowMatch.most_playing, 1, 'Dependent matches played at once.')
+
+    def test_double_elimination(self):
+        """Test playing a double-elimination cup."""
+        self.assert_same_play(lambda match_class: PowerOfTwoDoubleEliminationCup(
+            match_class=match_class, rounds=3))
+
+    def test_drawn_final(self):
+        """Test that a drawn double-elimination final is played once per leg."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=3)
+        final_match = cup.final
+        plays = []
+
+        def draw():
+            plays.append(final_match)
+            final_match.score1 = final_match.score2 = 1
+            final_match.winner = final_match.loser = None
+
+        final_match.play = draw
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertIsNone(cup.play_cup(executor), 'Drawn final has a winner.')
+        self.assertEqual(len(plays), 2, 'Final not played once per leg.')
+        self.assertListEqual(cup.final_scores, [(1, 1), (1, 1)])
+        self.assertTrue(cup.finished, 'Cup not finished.')
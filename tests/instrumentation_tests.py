@@ -0,0 +1,141 @@
+# -*- coding: utf-8  -*-
+"""Tests for the counters and timings of played matches."""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+from . import TestCase
+
+from competitions.cup import BracketObserver
+from competitions.cup.default.poweroftwo_double import PowerOfTwoDoubleEliminationCup
+from competitions.cup.default.single_elimination import StandardSingleEliminationCup
+from competitions.cup.instrumentation import LatencyHistogram, MatchStatistics
+from competitions.match.default.TestMatch import TestMatch
+
+
+class DrawnOnceMatch(TestMatch):
+
+    """A test match that is drawn the first time it is played."""
+
+    def play(self):
+        """Play the match, without a winner the first time."""
+        if getattr(self, 'drawn', False):
+            return super(DrawnOnceMatch, self).play()
+        self.drawn = True
+        self.score1 = self.score2 = 0
+        self.winner = None
+
+
+class EventLog(BracketObserver):
+
+    """An observer logging the events it follows."""
+
+    def __init__(self):
+        """Constructor."""
+        self.events = []
+
+    def match_replayed(self, bracket, match):
+        """Log a replayed match."""
+        self.events.append(('replayed', str(match.team1)))
+
+    def match_played(self, bracket, match):
+        """Log a played match."""
+        self.events.append(('played', str(match.team1)))
+
+
+class WalkoverLog(EventLog):
+
+    """An observer logging walkovers too."""
+
+    def walkover_skipped(self, bracket, round_num, match_num):
+        """Log a walkover."""
+        self.events.append(('walkover', round_num, match_num))
+
+
+class TestMatchStatistics(TestCase):
+
+    """Tests for the MatchStatistics class."""
+
+    def test_replays_and_walkovers(self):
+        """Test counting replayed matches and walkovers."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        teams[3] = None
+        cup = StandardSingleEliminationCup(match_class=DrawnOnceMatch, rounds=3, teams=teams)
+        statistics = MatchStatistics()
+        log = EventLog()
+        cup.add_observer(statistics)
+        cup.add_observer(log)
+        cup.play_cup()
+        self.assertEqual(statistics.counts, {'started': 6, 'plays': 12, 'replays': 6,
+                                             'walkovers': 1, 'final_replays': 0,
+                                             'played': 6})
+        self.assertEqual(statistics.play_times.count, 12)
+        self.assertEqual(statistics.match_times.count, 6)
+        self.assertListEqual(log.events[:2], [('replayed', 'Team 1'), ('played', 'Team 1')])
+
+    def test_walkover_rounds(self):
+        """Test that the walkovers of rounds without played matches are counted."""
+        teams = ['Team {}'.format(x + 1) if x % 2 == 0 else None for x in range(8)]
+        cup = StandardSingleEliminationCup(match_class=TestMatch, rounds=3, teams=teams)
+        statistics = MatchStatistics()
+        log = WalkoverLog()
+        cup.add_observer(statistics)
+        cup.add_observer(log)
+        cup.play_cup()
+        self.assertEqual(statistics.counts['walkovers'], 4)
+        self.assertEqual(statistics.counts['played'], 3)
+        self.assertListEqual(log.events[:5], [('walkover', 0, 0), ('walkover', 0, 1),
+                                              ('walkover', 0, 2), ('walkover', 0, 3),
+                                              ('played', 'Team 1')])
+
+    def test_final_replay(self):
+        """Test counting a replayed double-elimination final."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=2)
+        for __ in range(5):
+            cup.step()
+        statistics = MatchStatistics()
+        cup.add_observer(statistics)
+        cup.final.team1, cup.final.team2 = cup.final.team2, cup.final.team1
+        cup.step()
+        self.assertEqual(cup.winner, 'Team 3')
+        self.assertEqual(statistics.counts['final_replays'], 1)
+        self.assertEqual(statistics.counts['plays'], 2)
+        self.assertEqual(statistics.counts['played'], 1)
+
+    def test_double_elimination(self):
+        """Test that a double-elimination cup reports the matches of its brackets."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=3)
+        statistics = MatchStatistics()
+        cup.add_observer(statistics)
+        self.assertEqual(cup.play_cup(), 'Team 1')
+        self.assertEqual(statistics.counts['started'], 14)
+        self.assertEqual(statistics.counts['played'], 14)
+        cup.remove_observer(statistics)
+        self.assertEqual(cup.clone().play_cup(), 'Team 1')
+        self.assertEqual(statistics.counts['played'], 14, 'Removed observer notified.')
+
+    def test_histogram(self):
+        """Test the latency histogram."""
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(50), 0.0)
+        for seconds in (0.0000005, 0.000003, 0.000003, 0.001):
+            histogram.add(seconds)
+        self.assertListEqual(histogram.buckets[:3], [1, 0, 2])
+        self.assertEqual(sum(histogram.buckets), 4)
+        self.assertEqual(histogram.percentile(50), 0.000004)
+        self.assertEqual(histogram.percentile(100), 0.001)
+        self.assertAlmostEqual(histogram.mean, 0.0010065 / 4)
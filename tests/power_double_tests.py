@@ -20,9 +20,14 @@ from __future__ import unicode_literals
 
 # import unittest
 
+import gc
+import weakref
+
+from io import StringIO
+
 from . import TestCase, PY3
 
-from competitions.cup import CupFinished
+from competitions.cup import Bracket, CupFinished
 from competitions.cup.default.poweroftwo_double import (
     PowerOfTwoDoubleEliminationCup, PowerOfTwoLosersBracket
 )
@@ -100,6 +105,31 @@ class TestPowerOfTwoDoubleEliminationCup(TestCase):
         self.assertEqual(final_match.team2, teams[4], 'Second finalist is wrong.')
         self.assertEqual(cup.winner, 'Team 1', 'Cup has wrong winner.')
 
+    def test_iter_matches(self):
+        """Test playing the cup without exceptions."""
+        cup = CupClass(match_class=MatchClass, rounds=3)
+        matches = list(cup.iter_matches())
+        self.assertEqual(len(matches), 14, 'Wrong number of matches played.')
+        self.assertIs(matches[-1], cup.final, 'Final not played last.')
+        self.assertEqual(cup.winner, 'Team 1', 'Cup has wrong winner.')
+        self.assertIsNone(cup.step(), 'Finished cup played a match.')
+
+    def test_schedule(self):
+        """Test the play order of the brackets."""
+        cup = CupClass(match_class=MatchClass, rounds=3)
+        winners, losers = cup.winners_bracket, cup.losers_bracket
+        self.assertEqual(len(cup.schedule), 14, 'Wrong number of matches scheduled.')
+        self.assertListEqual([(bracket, round_num) for bracket, round_num, __ in cup.schedule],
+                             [(winners, 0)] * 4 + [(losers, 0)] * 2 + [(winners, 1)] * 2 +
+                             [(losers, 1)] * 2 + [(losers, 2)] + [(winners, 2)] +
+                             [(losers, 3)] + [(cup, 0)])
+        fixtures = list(cup.fixtures())
+        self.assertEqual(fixtures[4][3:], ('Match 1 Loser', 'Match 2 Loser'))
+        self.assertEqual(fixtures[-1][3:], ('Winners Bracket Winner', 'Losers Bracket Winner'))
+        played = [match for match in cup.iter_matches()]
+        self.assertListEqual(played, [bracket.matches[round_num][match_num]
+                                      for bracket, round_num, match_num in cup.schedule])
+
     def test_replay(self):
         """Test replaying the final depending on the winner."""
         teams = ['Team {}'.format(x + 1) for x in range(8)]
@@ -113,6 +143,126 @@ class TestPowerOfTwoDoubleEliminationCup(TestCase):
         self.assertEqual(final_match.team2, teams[0], 'Flipped second finalist is wrong.')
         self.assertEqual(cup.winner, 'Team 5', 'Cup has wrong winner.')
 
+    def test_drawn_final(self):
+        """Test that a cup with a drawn final is finished without a winner."""
+        cup = CupClass(match_class=MatchClass, rounds=3, require_double_win=False)
+        for __ in range(13):
+            cup.play_match()
+        final_match = cup.final
+
+        def draw():
+            final_match.score1 = final_match.score2 = 1
+            final_match.winner = final_match.loser = None
+
+        final_match.play = draw
+        self.assertFalse(cup.finished, 'Cup finished early.')
+        with self.assertRaises(CupFinished) as context:
+            cup.play_match()
+        self.assertIsNone(context.exception.winner, 'Drawn final has a winner.')
+        self.assertTrue(cup.finished, 'Cup not finished.')
+        self.assertListEqual(cup.final_scores, [(1, 1), ('', '')])
+        self.assertIsNone(cup.step(), 'Match played after the final.')
+        self.assertRaises(CupFinished, cup.play_match)
+
+    def test_reset(self):
+        """Test that a played cup can be reset and replayed."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        cup = CupClass(match_class=MatchClass, rounds=3, teams=teams)
+        cup.play_cup()
+        cup.reset()
+        self.assertEqual(cup.print_cup(display=False),
+                         CupClass(match_class=MatchClass, rounds=3, teams=teams).print_cup(
+                             display=False), 'Results not cleared.')
+        self.assertIsNone(cup.winner, 'Winner not reset.')
+        self.assertEqual(cup.final.team1, 'Winners Bracket Winner', 'Final not reset.')
+        self.assertEqual(cup.losers_bracket.matches[1][0].team1, 'Match 6 Loser',
+                         'Losers bracket not reset.')
+        self.assertEqual(cup.play_cup(), 'Team 1', 'Cup has wrong winner.')
+        self.assertEqual(cup.final.team2, teams[4], 'Second finalist is wrong.')
+
+    def test_template_references(self):
+        """Test that the cached templates do not keep a deleted cup alive."""
+
+        class Team(object):
+
+            def __init__(self, name):
+                self.name = name
+
+            def __format__(self, format_spec):
+                return format(self.name, format_spec)
+
+        Bracket._templates.clear()
+        teams = [Team('Team {}'.format(x + 1)) for x in range(8)]
+        cup = CupClass(match_class=MatchClass, rounds=3, teams=teams)
+        cup.play_cup()
+        cup.print_cup(display=False)
+        self.assertTrue(Bracket._templates, 'No templates cached.')
+        cup_ref = weakref.ref(cup)
+        team_ref = weakref.ref(teams[0])
+        del cup, teams
+        gc.collect()
+        self.assertIsNone(cup_ref(), 'Cup kept alive.')
+        self.assertIsNone(team_ref(), 'Team kept alive.')
+        clone = CupClass(match_class=MatchClass, rounds=3)
+        self.assertEqual(clone.play_cup(), 'Team 1', 'Cup built from template has wrong winner.')
+
+    def test_clone(self):
+        """Test that clones are new, independent cups of the same shape."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        cup = CupClass(match_class=MatchClass, rounds=3, teams=teams)
+        printout = cup.print_cup(display=False)
+        cup.play_cup()
+        clone = cup.clone()
+        self.assertIsNone(clone.winner, 'Clone already played.')
+        self.assertEqual(clone.print_cup(display=False), printout, 'Wrong clone printed.')
+        self.assertIs(clone.schedule[0][0], clone.winners_bracket, 'Schedule not rebound.')
+        self.assertEqual(clone.losers_bracket.matches[1][0].team1, 'Match 6 Loser')
+        other = cup.clone(list(reversed(teams)))
+        self.assertEqual(other.play_cup(), 'Team 8', 'Clone has wrong winner.')
+        self.assertEqual(clone.play_cup(), 'Team 1', 'Clone has wrong winner.')
+        self.assertEqual(clone.print_cup(display=False), cup.print_cup(display=False))
+
+    def test_fork(self):
+        """Test that forks of a cup in progress are played separately."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        cup = CupClass(match_class=MatchClass, rounds=3, teams=teams)
+        for __ in range(9):
+            cup.step()
+        printout = cup.print_cup(display=False)
+        fork = cup.fork()
+        self.assertIs(fork.schedule[0][0], fork.winners_bracket, 'Schedule not rebound.')
+        self.assertIs(fork.current_bracket, fork.losers_bracket, 'Wrong current bracket.')
+        self.assertEqual(fork.play_cup(), 'Team 1', 'Fork has wrong winner.')
+        self.assertEqual(fork.final.team2, teams[4], 'Second finalist is wrong.')
+        fork.reset()
+        self.assertIsNone(cup.winner, 'Parent played.')
+        self.assertEqual(cup.print_cup(display=False), printout, 'Parent changed.')
+        self.assertEqual(cup.play_cup(), 'Team 1', 'Parent has wrong winner.')
+        results = cup.fork().simulate(3)
+        self.assertEqual(results.titles['Team 1'], 3, 'Wrong simulated winner.')
+        self.assertIs(cup.fork().winner, cup.winner, 'Winner not kept.')
+
+    def test_cached_printout(self):
+        """Test that the cached printout follows the state of the cup."""
+        cup = CupClass(match_class=MatchClass, rounds=3)
+        for __ in range(2):
+            cup.print_cup(display=False)
+            for match in cup.iter_matches():
+                fp = StringIO()
+                cup.write_cup(fp)
+                self.assertEqual(cup.print_cup(display=False), fp.getvalue(), 'Stale printout.')
+            cup.reset()
+
+    def test_viewport(self):
+        """Test printing a region of one bracket."""
+        cup = CupClass(match_class=MatchClass, rounds=3)
+        cup.play_cup()
+        view = cup.print_cup(display=False, rounds=(2, 4), bracket='losers')
+        self.assertEqual(view, cup.losers_bracket.print_cup(display=False, rounds=(2, 4)))
+        self.assertIn('Team 5', view, 'Losers bracket final not shown.')
+        self.assertRaises(ValueError, cup.print_cup, display=False, rounds=(0, 1))
+        self.assertRaises(ValueError, cup.print_cup, display=False, bracket='final')
+
     def test_cup_printout(self):
         """Test the printout of the cup when completed."""
         teams = ['Team {}'.format(x + 1) for x in range(8)]
@@ -237,6 +387,9 @@ class TestPowerOfTwoDoubleEliminationCup(TestCase):
         )
         self.assertEqual(cup.print_cup(), expected_string,
                          'Wrong bracket printed.')
+        fp = StringIO()
+        cup.write_cup(fp)
+        self.assertEqual(fp.getvalue(), expected_string, 'Wrong bracket written.')
 
 
 class TestPowerOfTwoLosersBracket(TestCase):
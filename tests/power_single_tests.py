@@ -20,9 +20,13 @@ from __future__ import unicode_literals
 
 # import unittest
 
+import functools
+
+from io import StringIO
+
 from . import TestCase, PY3
 
-from competitions.cup import CupFinished
+from competitions.cup import CupFinished, MatchWinner
 from competitions.cup.default.single_elimination import PowerOfTwoSingleEliminationCup
 from competitions.match.default.TestMatch import TestMatch
 
@@ -91,6 +95,161 @@ class TestPowerOfTwoSingleEliminationCup(TestCase):
         self.assertEqual(final_match.team2, teams[4], 'Second finalist is wrong.')
         self.assertEqual(cup.winner, 'Team 1', 'Cup has wrong winner.')
 
+    def test_two_teams(self):
+        """Test a cup of a single round."""
+        cup = CupClass(match_class=MatchClass, rounds=1, teams=['Team 1', 'Team 2'])
+        self.assertEqual(len(cup.matches), 1, 'Cup has an empty round.')
+        self.assertEqual(cup.play_cup(), 'Team 1', 'Cup has wrong winner.')
+        self.assertTrue(cup.finished, 'Cup not finished.')
+        self.assertRaises(CupFinished, cup.play_match)
+
+    def test_iter_matches(self):
+        """Test playing the cup without exceptions."""
+        cup = CupClass(match_class=MatchClass, rounds=3)
+        first_match = cup.step()
+        self.assertIs(first_match, cup.matches[0][0], 'Wrong match played.')
+        matches = list(cup.iter_matches())
+        self.assertEqual(len(matches), 6, 'Wrong number of matches played.')
+        self.assertIs(matches[-1], cup.matches[2][0], 'Final not played last.')
+        self.assertEqual(cup.winner, 'Team 1', 'Cup has wrong winner.')
+        self.assertIsNone(cup.step(), 'Finished cup played a match.')
+        self.assertRaises(CupFinished, cup.play_match)
+
+    def test_reset(self):
+        """Test that a played cup can be reset and replayed."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        cup = CupClass(match_class=MatchClass, rounds=3, teams=teams)
+        first_match = cup.matches[0][0]
+        cup.play_cup()
+        # The pairings are copied from the shape of the cup, not generated again
+        cup._generate_pairings = None
+        cup.reset()
+        self.assertIsNot(cup.matches[0][0], first_match, 'Played match kept.')
+        self.assertEqual(cup.matches[0][0].score1, '', 'Result not cleared.')
+        self.assertEqual(cup.print_cup(display=False),
+                         CupClass(match_class=MatchClass, rounds=3, teams=teams).print_cup(
+                             display=False), 'Results not cleared.')
+        self.assertIsNone(cup.winner, 'Winner not reset.')
+        self.assertEqual(cup.matches[1][1].team2, 'Match 4 Winner', 'Placeholder not restored.')
+        self.assertEqual(cup.matches[2][0].team1, 'Match 5 Winner', 'Placeholder not restored.')
+        cup.update_teams(list(reversed(teams)))
+        cup.play_cup()
+        cup.reset()
+        self.assertEqual(cup.matches[0][0].team1, 'Team 8', 'Updated teams not used.')
+        self.assertEqual(cup.play_cup(), 'Team 8', 'Cup has wrong winner.')
+
+    def test_reset_match_factory(self):
+        """Test that reset matches are created again by the match class."""
+
+        class WeightedMatch(MatchClass):
+
+            def __init__(self, team1, team2, weight=1):
+                super(WeightedMatch, self).__init__(team1, team2)
+                self.weight = weight
+
+        cup = CupClass(match_class=functools.partial(WeightedMatch, weight=7), rounds=3)
+        for __ in range(5):
+            cup.play_match()
+        cup.simulate(2)
+        self.assertSetEqual(set(match.weight for match in cup.iter_matches()), set([7]))
+        cup.reset()
+        self.assertSetEqual(set(match.weight for round in cup.matches for match in round),
+                            set([7]))
+
+    def test_clone(self):
+        """Test that clones are new, independent cups of the same shape."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        cup = CupClass(match_class=MatchClass, rounds=3, teams=teams)
+        cup.play_match()
+        clone = cup.clone(['New {}'.format(x + 1) for x in range(8)])
+        self.assertIsNot(clone.matches[1], cup.matches[1], 'Round shared.')
+        self.assertEqual(clone.matches[0][0].team1, 'New 1', 'New teams not used.')
+        self.assertEqual(clone.matches[1][0].team1, 'Match 1 Winner', 'Clone already played.')
+        self.assertEqual(clone.play_cup(), 'New 1', 'Clone has wrong winner.')
+        self.assertEqual(cup.matches[1][0].team1, 'Team 1', 'Original changed.')
+        self.assertEqual(cup.matches[1][0].team2, 'Match 2 Winner', 'Original changed.')
+        self.assertListEqual([entry[0] for entry in clone.fixtures()], [clone] * 7)
+
+    def test_fork(self):
+        """Test that forks share played matches without changing them."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        cup = CupClass(match_class=MatchClass, rounds=3, teams=teams)
+        for __ in range(3):
+            cup.step()
+        printout = cup.print_cup(display=False)
+        fork = cup.fork()
+        self.assertIs(fork.matches[0][0], cup.matches[0][0], 'Played match copied.')
+        self.assertEqual(fork.print_cup(display=False), printout, 'Wrong fork printed.')
+        self.assertEqual(fork.play_cup(), 'Team 1', 'Fork has wrong winner.')
+        self.assertIsNone(cup.winner, 'Parent played.')
+        fork.update_teams(list(reversed(teams)))
+        fork.reset()
+        self.assertEqual(fork.matches[0][0].team1, 'Team 8', 'Fork not reset.')
+        self.assertEqual(fork.matches[0][0].score1, '', 'Fork result not cleared.')
+        self.assertEqual(cup.matches[0][0].team1, 'Team 1', 'Shared match changed.')
+        self.assertEqual(cup.print_cup(display=False), printout, 'Parent changed.')
+        self.assertEqual(cup.play_cup(), 'Team 1', 'Parent has wrong winner.')
+
+    def test_lazy_matches(self):
+        """Test that matches are only created when they are needed."""
+        created = []
+
+        class CountingMatch(MatchClass):
+
+            def __init__(self, team1, team2):
+                super(CountingMatch, self).__init__(team1, team2)
+                created.append(self)
+
+        cup = CupClass(match_class=CountingMatch, rounds=4)
+        self.assertEqual(len(created), 0, 'Matches created up front.')
+        cup.play_match()
+        self.assertEqual(len(created), 1, 'Unplayed matches created.')
+        self.assertEqual(cup.matches[1][0].team1, 'Team 1', 'Winner not assigned.')
+        self.assertEqual(cup.matches[1][0].team2, 'Match 2 Winner', 'Placeholder missing.')
+        cup.play_cup()
+        self.assertEqual(len(created), 15, 'Wrong number of matches created.')
+
+    def test_placeholders(self):
+        """Test that placeholders are references rendered as text."""
+        cup = CupClass(match_class=MatchClass, rounds=3)
+        placeholder = cup.matches[2][0].team2
+        self.assertIsInstance(placeholder, MatchWinner)
+        self.assertEqual(placeholder.match_num, 6, 'Wrong match referenced.')
+        self.assertEqual(unicode(placeholder), 'Match 6 Winner', 'Wrong placeholder text.')
+        self.assertEqual('{:>16}'.format(placeholder), '  Match 6 Winner')
+        self.assertEqual(placeholder, MatchWinner(6))
+        self.assertNotEqual(placeholder, MatchWinner(5))
+        self.assertIn('Match 6 Winner', {placeholder})
+
+    def test_cached_printout(self):
+        """Test that the cached printout follows the state of the cup."""
+        cup = CupClass(match_class=MatchClass, rounds=3)
+        printout = cup.print_cup(display=False)
+        self.assertIs(cup.print_cup(display=False), printout, 'Printout not cached.')
+        version = cup.version
+        for match in cup.iter_matches():
+            self.assertGreater(cup.version, version, 'Version not increased.')
+            version = cup.version
+            fp = StringIO()
+            cup.write_cup(fp)
+            self.assertEqual(cup.print_cup(display=False), fp.getvalue(), 'Stale printout.')
+        cup.update_teams(['New {}'.format(x + 1) for x in range(8)])
+        self.assertGreater(cup.version, version, 'Version not increased.')
+        self.assertIn('New 8', cup.print_cup(display=False), 'Updated teams not printed.')
+
+    def test_viewport(self):
+        """Test printing a region of the cup."""
+        cup = CupClass(match_class=MatchClass, rounds=4)
+        cup.play_cup()
+        lines = cup.print_cup(display=False).split('\n')
+        # Rounds 2 and 3 next to the second and third second-round matches
+        view = cup.print_cup(display=False, rounds=(1, 3), matches=(1, 3))
+        expected = '\n' + ''.join(line[40:120] + '\n' for line in lines[10:23])
+        self.assertEqual(view, expected, 'Wrong region printed.')
+        fp = StringIO()
+        cup.write_cup(fp, rounds=(1, 3), matches=(1, 3))
+        self.assertEqual(fp.getvalue(), view, 'Wrong region written.')
+
     def test_cup_printout(self):
         """Test the printout of the cup when completed."""
         teams = ['Team {}'.format(x + 1) for x in range(8)]
@@ -161,3 +320,6 @@ class TestPowerOfTwoSingleEliminationCup(TestCase):
         )
         self.assertEqual(cup.print_cup(), expected_string,
                          'Wrong bracket printed.')
+        fp = StringIO()
+        cup.write_cup(fp)
+        self.assertEqual(fp.getvalue(), expected_string, 'Wrong bracket written.')
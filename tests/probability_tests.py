@@ -0,0 +1,223 @@
+# -*- coding: utf-8  -*-
+"""Tests for exact outcome probabilities of cups."""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division, unicode_literals
+
+import random
+import unittest
+
+from . import MatrixMatch, TestCase
+
+from competitions.cup.default.poweroftwo_double import PowerOfTwoDoubleEliminationCup
+from competitions.cup.default.single_elimination import (
+    PowerOfTwoSingleEliminationCup, StandardSingleEliminationCup
+)
+from competitions.cup.default.stepladder import StepladderCup
+from competitions.cup.probability import (
+    double_elimination_probabilities, live_odds, single_elimination_probabilities,
+    stepladder_probabilities
+)
+from competitions.match.default.SimpleMatch import SimpleMatch
+from competitions.match.default.TestMatch import TestMatch
+
+try:
+    import numpy
+    from competitions.cup.vectorized import simulate_double_elimination
+except ImportError:
+    numpy = None
+
+
+def random_matrix(team_count, seed):
+    """Return a random matrix of win probabilities."""
+    rng = random.Random(seed)
+    return [[rng.random() for __ in range(team_count)] for __ in range(team_count)]
+
+
+class TestSingleEliminationProbabilities(TestCase):
+
+    """Tests for exact probabilities of single-elimination cups."""
+
+    def test_four_teams(self):
+        """Test the probabilities of a four-team cup."""
+        matrix = random_matrix(4, 1)
+        cup = PowerOfTwoSingleEliminationCup(match_class=TestMatch, rounds=2)
+        result = single_elimination_probabilities(cup, matrix)
+        first = [matrix[0][1], 1 - matrix[0][1]]
+        second = [matrix[2][3], 1 - matrix[2][3]]
+        expected = first[0] * (second[0] * matrix[0][2] + second[1] * matrix[0][3])
+        self.assertAlmostEqual(result.titles[0], expected)
+        expected = second[1] * (first[0] * (1 - matrix[0][3]) + first[1] * (1 - matrix[1][3]))
+        self.assertAlmostEqual(result.titles[3], expected)
+        self.assertListEqual(result.rounds[1], [1.0, first[1]])
+        self.assertAlmostEqual(sum(result.titles), 1.0)
+        self.assertAlmostEqual(result.wins[2], second[0] + result.titles[2])
+
+    def test_home_wins(self):
+        """Test the probabilities when the first team always wins."""
+        cup = PowerOfTwoSingleEliminationCup(match_class=TestMatch, rounds=3)
+        result = single_elimination_probabilities(cup, [[1.0] * 8 for __ in range(8)])
+        self.assertListEqual(result.titles, [1.0] + [0.0] * 7)
+        self.assertListEqual(result.rounds[4], [1.0, 1.0, 1.0])
+        self.assertListEqual(result.rounds[6], [1.0, 1.0, 0.0])
+
+    def test_walkovers(self):
+        """Test that walkovers are awarded."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        teams[3] = None
+        cup = StandardSingleEliminationCup(match_class=TestMatch, rounds=3, teams=teams)
+        matrix = random_matrix(8, 2)
+        result = single_elimination_probabilities(cup, matrix)
+        self.assertListEqual(result.rounds[3], [0.0, 0.0, 0.0])
+        self.assertEqual(result.rounds[2][1], 1.0)
+        self.assertAlmostEqual(sum(result.titles), 1.0)
+        expected = (1 - matrix[0][2]) * matrix[0][1] + (1 - matrix[1][2]) * (1 - matrix[0][1])
+        self.assertAlmostEqual(result.rounds[2][2], expected)
+
+
+class TestStepladderProbabilities(TestCase):
+
+    """Tests for exact probabilities of stepladder cups."""
+
+    def test_three_teams(self):
+        """Test the probabilities of a three-team cup."""
+        matrix = random_matrix(3, 3)
+        cup = StepladderCup(match_class=TestMatch, team_count=3)
+        result = stepladder_probabilities(cup, matrix)
+        first = [matrix[0][1], 1 - matrix[0][1]]
+        self.assertAlmostEqual(result.titles[2], first[0] * matrix[2][0] + first[1] * matrix[2][1])
+        self.assertAlmostEqual(result.titles[0], first[0] * (1 - matrix[2][0]))
+        self.assertAlmostEqual(result.wins[1], first[1] * (2 - matrix[2][1]))
+        self.assertListEqual(result.rounds[0], [1.0, first[0]])
+        self.assertListEqual(result.rounds[2], [0.0, 1.0])
+
+    def test_home_wins(self):
+        """Test the probabilities when the first team always wins."""
+        cup = StepladderCup(match_class=TestMatch, team_count=8)
+        result = stepladder_probabilities(cup, [[1.0] * 8 for __ in range(8)])
+        self.assertListEqual(result.titles, [0.0] * 7 + [1.0])
+        self.assertListEqual(result.wins, [1.0, 0.0] + [1.0] * 6)
+        self.assertListEqual(result.rounds[3], [0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0])
+
+    def test_total(self):
+        """Test that the probabilities add up."""
+        cup = StepladderCup(match_class=TestMatch, team_count=12)
+        result = stepladder_probabilities(cup, random_matrix(12, 4))
+        self.assertAlmostEqual(sum(result.titles), 1.0)
+        self.assertAlmostEqual(sum(result.wins), 11.0)
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestDoubleEliminationProbabilities(TestCase):
+
+    """Tests for exact probabilities of double-elimination cups."""
+
+    def test_object_model(self):
+        """Test that results match the cup objects for deterministic matches."""
+        rng = random.Random(8)
+        for rounds in range(2, 6):
+            team_count = 2 ** rounds
+            for require_double_win in (True, False):
+                matrix = [[float(rng.random() < 0.5) for __ in range(team_count)]
+                          for __ in range(team_count)]
+                MatrixMatch.matrix = matrix
+                cup = PowerOfTwoDoubleEliminationCup(match_class=MatrixMatch, rounds=rounds,
+                                                     teams=list(range(1, team_count + 1)))
+                cup.require_double_win = require_double_win
+                result = double_elimination_probabilities(cup, matrix)
+                champion = cup.play_cup()
+                expected_titles = [0.0] * team_count
+                expected_titles[champion - 1] = 1.0
+                self.assertListEqual(result.titles, expected_titles)
+                expected_rounds = [[0.0] * (3 * rounds - 1) for __ in range(team_count)]
+                for round_num, teams in enumerate(cup._round_teams()):
+                    for team in teams:
+                        expected_rounds[team - 1][round_num] = 1.0
+                self.assertListEqual(result.rounds, expected_rounds)
+                __, __, wins = simulate_double_elimination(matrix, 1, require_double_win)
+                self.assertListEqual(result.wins, wins[0].tolist())
+
+    def test_even_cup(self):
+        """Test that evenly matched teams have the same probabilities."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=4)
+        result = double_elimination_probabilities(cup, [[0.5] * 16 for __ in range(16)])
+        for team in range(16):
+            self.assertAlmostEqual(result.titles[team], 1 / 16)
+        self.assertAlmostEqual(sum(result.wins), 30.5)
+
+    def test_monte_carlo(self):
+        """Test the probabilities against a simulation of the cup."""
+        matrix = random_matrix(8, 5)
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=3)
+        result = double_elimination_probabilities(cup, matrix)
+        self.assertAlmostEqual(sum(result.titles), 1.0)
+        champions, __, wins = simulate_double_elimination(matrix, 200000, seed=9)
+        titles = numpy.bincount(champions, minlength=8) / 200000
+        self.assertTrue(numpy.allclose(titles, result.titles, atol=0.005))
+        self.assertTrue(numpy.allclose(wins.mean(axis=0), result.wins, atol=0.02))
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestLiveOdds(TestCase):
+
+    """Tests for live title probabilities of cups."""
+
+    def assert_following(self, cup, matrix, exact):
+        """Check the live odds against fresh odds while the cup is played."""
+        odds = live_odds(cup, matrix)
+        self.assertTrue(numpy.allclose(odds.titles, exact(cup, matrix).titles))
+        for __ in cup.iter_matches():
+            fresh = live_odds(cup, matrix)
+            fresh.detach()
+            self.assertTrue(numpy.allclose(odds.titles, fresh.titles), 'Wrong update.')
+            self.assertAlmostEqual(sum(odds.titles), 1.0)
+        self.assertEqual(odds.titles[cup.teams.index(cup.winner)], 1.0, 'Winner not certain.')
+        cup.reset()
+        self.assertTrue(numpy.allclose(odds.titles, exact(cup, matrix).titles), 'Not reset.')
+
+    def test_single_elimination(self):
+        """Test following a single-elimination cup."""
+        random.seed(10)
+        cup = PowerOfTwoSingleEliminationCup(match_class=SimpleMatch, rounds=4)
+        self.assert_following(cup, random_matrix(16, 11), single_elimination_probabilities)
+
+    def test_walkovers(self):
+        """Test following a single-elimination cup with walkovers."""
+        random.seed(12)
+        teams = ['Team {}'.format(x + 1) for x in range(16)]
+        teams[1] = teams[10] = None
+        cup = StandardSingleEliminationCup(match_class=SimpleMatch, rounds=4, teams=teams)
+        self.assert_following(cup, random_matrix(16, 13), single_elimination_probabilities)
+
+    def test_stepladder(self):
+        """Test following a stepladder cup."""
+        random.seed(14)
+        cup = StepladderCup(match_class=SimpleMatch, team_count=10)
+        self.assert_following(cup, random_matrix(10, 15), stepladder_probabilities)
+
+    def test_fork(self):
+        """Test that forks of a cup do not update its odds."""
+        cup = PowerOfTwoSingleEliminationCup(match_class=TestMatch, rounds=3)
+        odds = live_odds(cup, random_matrix(8, 16))
+        titles = odds.titles
+        cup.fork().play_cup()
+        self.assertListEqual(odds.titles, titles, 'Odds followed a fork.')
+
+    def test_unsupported(self):
+        """Test that live odds are only given for supported cups."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=2)
+        self.assertRaises(TypeError, live_odds, cup, random_matrix(4, 17))
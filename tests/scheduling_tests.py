@@ -0,0 +1,132 @@
+# -*- coding: utf-8  -*-
+"""Tests for scheduling the matches of cups."""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import random
+
+from . import TestCase
+
+from competitions.cup.default.poweroftwo_double import PowerOfTwoDoubleEliminationCup
+from competitions.cup.default.single_elimination import StandardSingleEliminationCup
+from competitions.cup.default.stepladder import StepladderCup
+from competitions.cup.scheduling import Scheduler
+from competitions.match.default.TestMatch import TestMatch
+
+
+def play(scheduler, match):
+    """Play a match handed out by a scheduler and complete it."""
+    match.play()
+    scheduler.complete(match)
+
+
+class TestScheduler(TestCase):
+
+    """Tests for the Scheduler class."""
+
+    def assert_same_play(self, make_cup, seed):
+        """Check that matches completed in a random order give the same cup."""
+        cup = make_cup()
+        expected = make_cup()
+        expected.play_cup()
+        scheduler = Scheduler(cup)
+        rng = random.Random(seed)
+        in_play = []
+        while not scheduler.finished:
+            in_play.extend(scheduler.ready())
+            play(scheduler, in_play.pop(rng.randrange(len(in_play))))
+        self.assertFalse(in_play, 'Matches left in play.')
+        self.assertEqual(cup.winner, expected.winner, 'Wrong winner.')
+        self.assertEqual(cup.print_cup(display=False), expected.print_cup(display=False))
+        self.assertIsNone(cup.step(), 'Matches left to play.')
+
+    def test_random_order(self):
+        """Test completing matches in a random order."""
+        teams = ['Team {}'.format(x + 1) for x in range(16)]
+        teams[3] = teams[10] = None
+        for seed in range(5):
+            self.assert_same_play(lambda: PowerOfTwoDoubleEliminationCup(
+                match_class=TestMatch, rounds=4), seed)
+            self.assert_same_play(lambda: StandardSingleEliminationCup(
+                match_class=TestMatch, rounds=4, teams=teams), seed)
+            self.assert_same_play(lambda: StepladderCup(match_class=TestMatch, team_count=5),
+                                  seed)
+
+    def test_partly_played(self):
+        """Test scheduling a cup after some of its matches were played."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=3)
+        for __ in range(5):
+            cup.step()
+        expected = cup.fork()
+        scheduler = Scheduler(cup)
+        matches = scheduler.ready()
+        while matches:
+            for match in matches:
+                play(scheduler, match)
+            matches = scheduler.ready()
+        self.assertEqual(cup.winner, expected.play_cup(), 'Wrong winner.')
+
+    def test_double_elimination_dependencies(self):
+        """Test that double-elimination matches wait only for their own teams."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=3)
+        winners, losers = cup.winners_bracket, cup.losers_bracket
+        scheduler = Scheduler(cup)
+        first_round = scheduler.ready()
+        self.assertListEqual(first_round, list(winners.matches[0]), 'Wrong first matches.')
+        for match in first_round[:2]:
+            play(scheduler, match)
+        self.assertListEqual(scheduler.ready(), [losers.matches[0][0], winners.matches[1][0]],
+                             'Decided matches not handed out.')
+        self.assertEqual(scheduler.in_play, 4, 'Wrong number of matches in play.')
+        self.assertIsNone(cup.winner)
+        for match in first_round[2:]:
+            play(scheduler, match)
+        self.assertListEqual(scheduler.ready(), [losers.matches[0][1], winners.matches[1][1]],
+                             'Decided matches not handed out.')
+        # The winners bracket moves on before the losers bracket plays
+        play(scheduler, winners.matches[1][0])
+        play(scheduler, winners.matches[1][1])
+        self.assertListEqual(scheduler.ready(), [winners.matches[2][0]],
+                             'Winners bracket final not handed out.')
+        self.assertEqual(cup._next_fixture, 4, 'Results recorded out of order.')
+
+    def test_replayed_final(self):
+        """Test that a replayed final is handed out again."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=2)
+        for __ in range(5):
+            cup.step()
+        scheduler = Scheduler(cup)
+        final, = scheduler.ready()
+        self.assertIs(final, cup.final)
+        final.team1, final.team2 = final.team2, final.team1
+        play(scheduler, final)
+        self.assertIsNone(cup.winner, 'Final not replayed.')
+        self.assertListEqual(scheduler.ready(), [final], 'Final not handed out again.')
+        play(scheduler, final)
+        self.assertEqual(cup.winner, 'Team 3', 'Wrong winner.')
+        self.assertEqual(cup.final_scores[1], (5, 0), 'Replay not recorded.')
+        self.assertTrue(scheduler.finished)
+
+    def test_not_in_play(self):
+        """Test completing a match that was not handed out."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=2)
+        scheduler = Scheduler(cup)
+        self.assertRaises(ValueError, scheduler.complete, cup.winners_bracket.matches[1][0])
+        match = scheduler.ready()[0]
+        play(scheduler, match)
+        self.assertRaises(ValueError, scheduler.complete, match)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8  -*-
+"""Tests for repeated simulation of cups."""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import random
+
+from . import TestCase
+
+from competitions.cup.default.poweroftwo_double import PowerOfTwoDoubleEliminationCup
+from competitions.cup.default.single_elimination import (
+    PowerOfTwoSingleEliminationCup, StandardSingleEliminationCup
+)
+from competitions.cup.default.stepladder import StepladderCup
+from competitions.cup import simulation
+from competitions.cup.simulation import simulate_parallel
+from competitions.match.default.SimpleMatch import SimpleMatch
+from competitions.match.default.TestMatch import TestMatch
+
+
+class TestCupSimulation(TestCase):
+
+    """Tests for simulating cups repeatedly."""
+
+    def test_single_elimination(self):
+        """Test simulating a single-elimination cup."""
+        cup = PowerOfTwoSingleEliminationCup(match_class=TestMatch, rounds=3)
+        results = cup.simulate(10)
+        self.assertEqual(results.runs, 10)
+        self.assertDictEqual(results.titles, {'Team 1': 10})
+        self.assertListEqual(results.rounds['Team 5'], [10, 10, 10])
+        self.assertListEqual(results.rounds['Team 3'], [10, 10, 0])
+        self.assertListEqual(results.rounds['Team 2'], [10, 0, 0])
+        self.assertEqual(results.round_probability('Team 7', 1), 1.0)
+        self.assertEqual(cup.matches[1][0].team1, 'Match 1 Winner',
+                         'Bracket not rewound.')
+
+    def test_no_runs(self):
+        """Test the probabilities of a cup simulated no times."""
+        cup = PowerOfTwoSingleEliminationCup(match_class=TestMatch, rounds=3)
+        results = cup.simulate(0)
+        self.assertEqual(results.runs, 0)
+        self.assertEqual(results.title_probability('Team 1'), 0.0)
+        self.assertEqual(results.round_probability('Team 1', 0), 0.0)
+
+    def test_walkovers(self):
+        """Test simulating a cup with walkovers."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        teams[3] = None
+        cup = StandardSingleEliminationCup(match_class=TestMatch, rounds=3, teams=teams)
+        results = cup.simulate(3)
+        self.assertListEqual(results.rounds['Team 3'], [3, 3, 0])
+        self.assertNotIn(None, results.rounds)
+
+    def test_stepladder(self):
+        """Test simulating a stepladder cup."""
+        cup = StepladderCup(match_class=TestMatch, team_count=4)
+        results = cup.simulate(5)
+        self.assertEqual(results.title_probability('Team 4'), 1.0)
+        self.assertListEqual(results.rounds['Team 3'], [0, 5, 5])
+
+    def test_double_elimination(self):
+        """Test simulating a double-elimination cup."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=3)
+        results = cup.simulate(4)
+        self.assertDictEqual(results.titles, {'Team 1': 4})
+        # Three winners bracket rounds, four losers bracket rounds and the final
+        self.assertListEqual(results.rounds['Team 5'], [4, 4, 4, 0, 0, 0, 4, 4])
+        self.assertListEqual(results.rounds['Team 7'], [4, 4, 0, 0, 4, 4, 4, 0])
+
+    def test_partially_played(self):
+        """Test simulating a cup from a partially played state."""
+        cup = PowerOfTwoSingleEliminationCup(match_class=SimpleMatch, rounds=3)
+        for __ in range(4):
+            cup.play_match()
+        first_round_winners = [match.winner for match in cup.matches[0]]
+        random.seed(0)
+        results = cup.simulate(200)
+        self.assertEqual(sum(results.titles.values()), 200)
+        for team in cup.teams:
+            expected = 200 if team in first_round_winners else 0
+            self.assertEqual(results.rounds[team][1], expected)
+        self.assertEqual(cup.index, [0, 3])
+
+    def test_printout_unchanged(self):
+        """Test that simulating a cup leaves its printout unchanged."""
+        for cup in (PowerOfTwoSingleEliminationCup(match_class=TestMatch, rounds=3),
+                    PowerOfTwoDoubleEliminationCup(match_class=TestMatch, rounds=3)):
+            for __ in range(5):
+                cup.play_match()
+            printout = cup.print_cup(display=False)
+            cup.simulate(2)
+            self.assertEqual(cup.print_cup(display=False), printout,
+                             'Results of unplayed matches kept.')
+            self.assertEqual(cup.play_cup(), 'Team 1', 'Cup has wrong winner.')
+
+
+class TestParallelSimulation(TestCase):
+
+    """Tests for simulating cups in worker processes."""
+
+    def test_worker_count_independence(self):
+        """Test that results do not depend on the number of processes."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=SimpleMatch, rounds=3)
+        serial = simulate_parallel(cup, 250, processes=1, seed=5, chunk_size=40)
+        parallel = simulate_parallel(cup, 250, processes=3, seed=5, chunk_size=40)
+        self.assertEqual(serial.runs, 250)
+        self.assertDictEqual(serial.titles, parallel.titles)
+        self.assertDictEqual(serial.rounds, parallel.rounds)
+
+    def test_seed(self):
+        """Test that the base seed changes the results."""
+        cup = PowerOfTwoSingleEliminationCup(match_class=SimpleMatch, rounds=4)
+        first = simulate_parallel(cup, 200, processes=1, seed=1, chunk_size=50)
+        second = simulate_parallel(cup, 200, processes=1, seed=2, chunk_size=50)
+        self.assertNotEqual(first.titles, second.titles)
+
+    def test_single_process_isolation(self):
+        """Test that a single process leaves the cup and the random state alone."""
+        cup = PowerOfTwoDoubleEliminationCup(match_class=SimpleMatch, rounds=3)
+        for __ in range(5):
+            cup.play_match()
+        printout = cup.print_cup(display=False)
+        state = random.getstate()
+        simulate_parallel(cup, 100, processes=1, seed=3, chunk_size=30)
+        self.assertEqual(random.getstate(), state, 'Random state changed.')
+        self.assertEqual(cup.print_cup(display=False), printout, 'Cup changed.')
+        self.assertIsNone(simulation._worker_cup, 'Worker cup kept.')
@@ -22,7 +22,9 @@ from __future__ import unicode_literals
 
 from . import TestCase, PY3
 
-from competitions.cup import CupFinished
+import competitions.cup as cup_module
+
+from competitions.cup import CupFinished, PrintableBracket
 from competitions.cup.default.single_elimination import StandardSingleEliminationCup
 from competitions.match.default.TestMatch import TestMatch
 
@@ -87,6 +89,7 @@ class TestStandardSingleEliminationCup(TestCase):
         for __ in range(5):
             self.assertIsInstance(cup.play_match(), unicode, 'Cup ended early.')
         self.assertRaises(CupFinished, cup.play_match)
+        self.assertIsNone(cup.step(), 'Finished cup played a match.')
         sf1_match = cup.matches[1][0]
         self.assertEqual(sf1_match.team2, teams[2], 'Walkover not awarded.')
         final_match = cup.matches[2][0]
@@ -94,6 +97,87 @@ class TestStandardSingleEliminationCup(TestCase):
         self.assertEqual(final_match.team2, teams[4], 'Second finalist is wrong.')
         self.assertEqual(cup.winner, 'Team 1', 'Cup has wrong winner.')
 
+    def test_two_teams(self):
+        """Test a cup of a single round."""
+        cup = CupClass(match_class=MatchClass, rounds=1, teams=['Team 1', 'Team 2'])
+        self.assertEqual(len(cup.matches), 1, 'Cup has an empty round.')
+        self.assertEqual(cup.play_cup(), 'Team 1', 'Cup has wrong winner.')
+        self.assertTrue(cup.finished, 'Cup not finished.')
+        self.assertRaises(CupFinished, cup.play_match)
+
+    def test_schedule(self):
+        """Test that walkovers are left out of the schedule."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        teams[3] = None
+        cup = CupClass(match_class=MatchClass, rounds=3, teams=teams)
+        self.assertListEqual([(round_num, match_num) for __, round_num, match_num in cup.schedule],
+                             [(0, 0), (0, 2), (0, 3), (1, 0), (1, 1), (2, 0)])
+        fixtures = list(cup.fixtures())
+        self.assertEqual(fixtures[3][3:], ('Match 1 Winner', 'Team 3'), 'Walkover not shown.')
+        new_teams = list(reversed(teams))
+        cup.update_teams(new_teams)
+        self.assertEqual(len(cup.schedule), 6, 'Schedule not rebuilt.')
+        self.assertEqual(cup.schedule[1], (cup, 0, 1), 'Walkover not moved.')
+        self.assertEqual(cup.play_cup(), 'Team 8', 'Cup has wrong winner.')
+
+    def test_layout_skeleton(self):
+        """Test that layout skeletons are shared by cups of the same shape."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        teams[3] = None
+        cup = CupClass(match_class=MatchClass, rounds=3, teams=teams)
+        other = CupClass(match_class=MatchClass, rounds=3, teams=list(teams))
+        self.assertIs(cup._layout_skeleton(), other._layout_skeleton(), 'Skeleton not shared.')
+        self.assertNotIn(4, cup._layout_skeleton(), 'Walkover laid out.')
+        other.update_teams(['Team {}'.format(x + 1) for x in range(8)])
+        self.assertIsNot(cup._layout_skeleton(), other._layout_skeleton(),
+                         'Walkovers ignored.')
+        self.assertIn(4, other._layout_skeleton(), 'Match missing from layout.')
+
+    def test_layout_skeleton_cache(self):
+        """Test that the layout skeleton cache is bounded by its number of cells."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        teams[3] = None
+        small = CupClass(match_class=MatchClass, rounds=3)
+        other = CupClass(match_class=MatchClass, rounds=3, teams=teams)
+        large = CupClass(match_class=MatchClass, rounds=4)
+        oversized = CupClass(match_class=MatchClass, rounds=5)
+        cache_cells = cup_module._LAYOUT_SKELETON_CACHE_CELLS
+        PrintableBracket._layout_skeletons.clear()
+        PrintableBracket._layout_skeleton_cells = 0
+        # The skeletons have 14, 12, 30 and 62 cells
+        cup_module._LAYOUT_SKELETON_CACHE_CELLS = 45
+        try:
+            skeleton = small._layout_skeleton()
+            other._layout_skeleton()
+            self.assertIs(small._layout_skeleton(), skeleton, 'Skeleton not cached.')
+            large._layout_skeleton()
+            self.assertListEqual(list(PrintableBracket._layout_skeletons),
+                                 [small._layout_key(), large._layout_key()],
+                                 'Least recently used skeleton kept.')
+            self.assertEqual(PrintableBracket._layout_skeleton_cells, 44)
+            skeleton = oversized._layout_skeleton()
+            self.assertEqual(len(PrintableBracket._layout_skeletons), 2,
+                             'Oversized skeleton shared.')
+            self.assertIs(oversized._layout_skeleton(), skeleton, 'Skeleton not kept.')
+            self.assertIsNot(CupClass(match_class=MatchClass, rounds=5)._layout_skeleton(),
+                             skeleton, 'Oversized skeleton shared.')
+        finally:
+            cup_module._LAYOUT_SKELETON_CACHE_CELLS = cache_cells
+
+    def test_reset(self):
+        """Test that a played cup can be reset and replayed."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        teams[3] = None
+        cup = CupClass(match_class=MatchClass, rounds=3, teams=teams)
+        cup.play_cup()
+        cup.reset()
+        self.assertEqual(cup.print_cup(display=False),
+                         CupClass(match_class=MatchClass, rounds=3, teams=teams).print_cup(
+                             display=False), 'Results not cleared.')
+        self.assertEqual(cup.matches[1][0].team1, 'Match 1 Winner', 'Placeholder not restored.')
+        self.assertEqual(cup.matches[1][0].team2, teams[2], 'Walkover not restored.')
+        self.assertEqual(cup.play_cup(), 'Team 1', 'Cup has wrong winner.')
+
     def test_cup_printout(self):
         """Test the printout of the cup when completed."""
         teams = ['Team {}'.format(x + 1) for x in range(8)]
@@ -78,6 +78,29 @@ class TestStepladderCup(TestCase):
         self.assertEqual(final_match.team2, teams[6], 'Second finalist is wrong.')
         self.assertEqual(cup.winner, 'Team 8', 'Cup has wrong winner.')
 
+    def test_reset(self):
+        """Test that a played cup can be reset and replayed."""
+        teams = ['Team {}'.format(x + 1) for x in range(8)]
+        cup = CupClass(match_class=MatchClass, teams=teams)
+        cup.play_cup()
+        cup.reset()
+        self.assertEqual(cup.print_cup(display=False),
+                         CupClass(match_class=MatchClass, teams=teams).print_cup(display=False),
+                         'Results not cleared.')
+        self.assertIsNone(cup.winner, 'Winner not reset.')
+        self.assertEqual(cup.matches[3][0].team2, 'Match 3 Winner', 'Placeholder not restored.')
+        self.assertEqual(cup.play_cup(), 'Team 8', 'Cup has wrong winner.')
+
+    def test_sparse_layout(self):
+        """Test that the layout only holds the occupied cells."""
+        cup = CupClass(match_class=MatchClass, team_count=100)
+        layout = cup._generate_layout()
+        self.assertEqual((layout.row_count, layout.column_count), (101, 99))
+        self.assertEqual(sum(len(cells) for cells in layout.rows.values()), 198,
+                         'Blank cells stored.')
+        self.assertListEqual(layout.cells(0), [(98, cup.matches[98][0], 1)])
+        self.assertListEqual(layout.cells(100), [(0, cup.matches[0][0], 2)])
+
     def test_cup_printout(self):
         """Test the printout of the cup when completed."""
         teams = ['Team {}'.format(x + 1) for x in range(8)]
@@ -0,0 +1,118 @@
+# -*- coding: utf-8  -*-
+"""Tests for vectorized simulation of cups."""
+
+# Copyright (C) 2017 Alexander Jones
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division, unicode_literals
+
+import unittest
+
+from . import MatrixMatch, TestCase
+
+from competitions.cup.default.poweroftwo_double import PowerOfTwoDoubleEliminationCup
+
+try:
+    import numpy
+    from competitions.cup.vectorized import (
+        simulate_double_elimination, simulate_single_elimination
+    )
+except ImportError:
+    numpy = None
+
+
+def home_wins(team_count):
+    """Return a probability matrix where the first team always wins."""
+    return [[1.0] * team_count for __ in range(team_count)]
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestVectorizedSingleElimination(TestCase):
+
+    """Tests for vectorized single-elimination cups for powers of two."""
+
+    def test_team_count_validation(self):
+        """Test checking the size of the probability matrix."""
+        self.assertRaises(ValueError, simulate_single_elimination, home_wins(6), 10)
+        self.assertRaises(ValueError, simulate_single_elimination, [[0.5, 0.5]], 10)
+
+    def test_deterministic_results(self):
+        """Test the results when the first team always wins."""
+        champions, rounds = simulate_single_elimination(home_wins(8), 5)
+        self.assertListEqual(champions.tolist(), [0] * 5)
+        self.assertListEqual(rounds[3].tolist(), [3, 0, 1, 0, 2, 0, 1, 0])
+
+    def test_even_cup(self):
+        """Test that evenly matched teams win equally often."""
+        champions, rounds = simulate_single_elimination(numpy.full((16, 16), 0.5), 160000,
+                                                        seed=1)
+        titles = numpy.bincount(champions, minlength=16) / 160000
+        self.assertTrue(numpy.allclose(titles, 1 / 16, atol=0.005))
+        self.assertTrue(numpy.array_equal(rounds.sum(axis=1), numpy.full(160000, 15)))
+
+    def test_seed(self):
+        """Test that seeded simulations are reproducible."""
+        matrix = numpy.full((8, 8), 0.5)
+        first = simulate_single_elimination(matrix, 100, seed=3)
+        second = simulate_single_elimination(matrix, 100, seed=3)
+        self.assertTrue(numpy.array_equal(first[0], second[0]))
+        self.assertTrue(numpy.array_equal(first[1], second[1]))
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestVectorizedDoubleElimination(TestCase):
+
+    """Tests for vectorized double-elimination cups for powers of two."""
+
+    def test_team_count_validation(self):
+        """Test checking the size of the probability matrix."""
+        self.assertRaises(ValueError, simulate_double_elimination, home_wins(2), 10)
+        self.assertRaises(ValueError, simulate_double_elimination, home_wins(12), 10)
+
+    def test_object_model(self):
+        """Test that results match the cup objects for deterministic matches."""
+        rng = numpy.random.default_rng(7)
+        for rounds in range(2, 6):
+            team_count = 2 ** rounds
+            for require_double_win in (True, False):
+                matrix = (rng.random((team_count, team_count)) < 0.5).astype(float)
+                MatrixMatch.matrix = matrix
+                cup = PowerOfTwoDoubleEliminationCup(match_class=MatrixMatch, rounds=rounds,
+                                                     teams=list(range(1, team_count + 1)))
+                cup.require_double_win = require_double_win
+                champion = cup.play_cup()
+                expected_wins = [0] * team_count
+                for bracket in (cup.winners_bracket, cup.losers_bracket):
+                    for round in bracket.matches:
+                        for match in round:
+                            expected_wins[match.winner - 1] += 1
+                if champion == cup.final.team1:
+                    expected_wins[champion - 1] += 1
+                else:
+                    expected_wins[champion - 1] += 2 if require_double_win else 1
+                champions, finalists, wins = simulate_double_elimination(
+                    matrix, 3, require_double_win=require_double_win)
+                self.assertListEqual(champions.tolist(), [champion - 1] * 3)
+                self.assertListEqual(finalists[0].tolist(),
+                                     [cup.final.team1 - 1, cup.final.team2 - 1])
+                self.assertListEqual(wins[2].tolist(), expected_wins)
+
+    def test_even_cup(self):
+        """Test that evenly matched teams win equally often."""
+        champions, finalists, wins = simulate_double_elimination(numpy.full((8, 8), 0.5),
+                                                                 80000, seed=2)
+        titles = numpy.bincount(champions, minlength=8) / 80000
+        self.assertTrue(numpy.allclose(titles, 1 / 8, atol=0.006))
+        self.assertFalse((finalists[:, 0] == finalists[:, 1]).any())